@@ -0,0 +1,206 @@
+# app/admission.py
+"""
+Admission control for expensive endpoints (OCR/embedding uploads, LLM
+calls, document compare).
+
+Each request to a guarded endpoint must pass two gates:
+
+1. a per-user token bucket for the endpoint class (rate + burst);
+   an empty bucket answers 429 with Retry-After.
+2. a per-class concurrency limit; requests wait in a bounded queue for
+   at most ADMIT_QUEUE_TIMEOUT seconds, a full queue or an expired
+   deadline answers 503 with Retry-After.
+
+State is per process: with several uvicorn workers each enforces its own
+limits.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from jose import jwt
+
+from . import config, metrics
+
+
+class Policy:
+    def __init__(self, name, concurrency, rate, burst):
+        self.name = name
+        self.concurrency = concurrency
+        self.rate = rate            # tokens per second per user
+        self.burst = burst
+
+
+POLICIES = {
+    "upload": Policy("upload", config.ADMIT_UPLOAD_CONCURRENCY, config.ADMIT_UPLOAD_RATE, config.ADMIT_UPLOAD_BURST),
+    "llm": Policy("llm", config.ADMIT_LLM_CONCURRENCY, config.ADMIT_LLM_RATE, config.ADMIT_LLM_BURST),
+    "compare": Policy("compare", config.ADMIT_COMPARE_CONCURRENCY, config.ADMIT_COMPARE_RATE, config.ADMIT_COMPARE_BURST),
+}
+
+# (method, path prefix) -> policy name; checked in order
+ROUTES = [
+    ("POST", "/api/upload", "upload"),                  # /upload and /upload/bulk
+    ("GET", "/api/documents/summarize/", "llm"),
+    ("POST", "/api/documents/quiz/", "llm"),
+    ("POST", "/api/ask", "llm"),
+    ("POST", "/api/chat/", "llm"),                      # /chat/start and /chat/{id}/message
+    ("POST", "/api/documents/compare", "compare"),
+]
+
+
+def policy_for(method, path):
+    for m, prefix, name in ROUTES:
+        if method == m and path.startswith(prefix):
+            return POLICIES[name]
+    return None
+
+
+# ---------------------------------------------------------------
+# TOKEN BUCKETS (per user + policy)
+# ---------------------------------------------------------------
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Consume one token; returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else config.ADMIT_QUEUE_TIMEOUT
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+_buckets = {}
+
+
+def _bucket(user, policy):
+    key = (user, policy.name)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        if len(_buckets) >= config.ADMIT_MAX_BUCKETS:
+            # full buckets carry no state worth keeping
+            now = time.monotonic()
+            for k in [k for k, b in _buckets.items() if b.full(now)]:
+                del _buckets[k]
+        bucket = _buckets[key] = TokenBucket(policy.rate, policy.burst)
+    return bucket
+
+
+# ---------------------------------------------------------------
+# CONCURRENCY LIMITS (bounded FIFO queue with deadlines)
+# ---------------------------------------------------------------
+
+class Limiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.waiters = deque()
+
+    async def acquire(self, timeout):
+        """True once a slot is held; False when the queue is full or the deadline passes."""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return True
+        if len(self.waiters) >= config.ADMIT_MAX_QUEUE:
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # the slot was handed over just as the deadline hit (or the client went away)
+                self.release()
+            else:
+                fut.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+        finally:
+            if fut in self.waiters:
+                self.waiters.remove(fut)
+
+    def release(self):
+        # hand the slot straight to the oldest waiter, so active stays constant
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.active -= 1
+
+
+_limiters = {name: Limiter(p.concurrency) for name, p in POLICIES.items()}
+
+
+# ---------------------------------------------------------------
+# MIDDLEWARE
+# ---------------------------------------------------------------
+
+def _client_key(request: Request):
+    """Verified JWT subject when present (forged tokens must not drain someone else's bucket), else client IP."""
+    auth = request.headers.get("authorization") or ""
+    token = auth.split(" ", 1)[1] if auth.startswith("Bearer ") else None
+    if token:
+        try:
+            sub = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM]).get("sub")
+            if sub:
+                return sub
+        except Exception:
+            pass
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(status, policy, reason, retry_after, detail):
+    metrics.ADMISSION_REJECTED.inc(policy=policy.name, reason=reason)
+    return JSONResponse(
+        status_code=status,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def admit(request: Request, call_next):
+    policy = policy_for(request.method, request.url.path)
+    if policy is None or not config.ADMISSION_ENABLED:
+        return await call_next(request)
+
+    wait = _bucket(_client_key(request), policy).take()
+    if wait:
+        return _reject(429, policy, "rate_limited", wait, "Too many requests, slow down")
+
+    limiter = _limiters[policy.name]
+    start = time.perf_counter()
+    metrics.ADMISSION_QUEUED.inc(policy=policy.name)
+    try:
+        admitted = await limiter.acquire(config.ADMIT_QUEUE_TIMEOUT)
+    finally:
+        metrics.ADMISSION_QUEUED.dec(policy=policy.name)
+    metrics.ADMISSION_WAIT.observe(time.perf_counter() - start, policy=policy.name)
+
+    if not admitted:
+        return _reject(503, policy, "overloaded", config.ADMIT_QUEUE_TIMEOUT, "Server busy, try again shortly")
+
+    try:
+        return await call_next(request)
+    finally:
+        limiter.release()
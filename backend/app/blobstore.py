@@ -0,0 +1,210 @@
+# app/blobstore.py
+"""
+Content-addressed upload storage shared by all users.
+
+Identical bytes are stored once under UPLOAD_DIR/blobs/<aa>/<sha256><ext>
+and tracked in db.blobs with the set of owners (upload jobs, bulk entries,
+documents) holding a reference. Owner ids are chosen by the caller, so
+taking or dropping a reference is idempotent and a retried job cannot
+count twice. The blob record also caches the extracted text, so
+re-uploads of the same file by other users skip extraction (vectors live
+in app/embedding_cache.py).
+Per-user metadata and access control stay on db.documents.
+"""
+import asyncio
+import glob
+import os
+import uuid
+from datetime import datetime
+
+from . import config, metrics
+from .extract import extract_text
+from .file_responses import file_sha256
+from .previews import PREVIEW_DIR
+
+BLOB_DIR = os.path.join(config.UPLOAD_DIR, "blobs")
+TMP_DIR = os.path.join(config.UPLOAD_DIR, "tmp")
+os.makedirs(BLOB_DIR, exist_ok=True)
+os.makedirs(TMP_DIR, exist_ok=True)
+
+
+def is_blob(stored_path):
+    return stored_path.startswith("blobs/")
+
+
+def temp_path(ext=""):
+    """Scratch file for streaming an upload before it is hashed."""
+    return os.path.join(TMP_DIR, f"{uuid.uuid4()}{ext}")
+
+
+def new_owner(kind="upload"):
+    """Fresh owner id for a reference taken outside a job (e.g. an HTTP upload)."""
+    return f"{kind}:{uuid.uuid4().hex}"
+
+
+def _key(content_hash, ext):
+    return f"{content_hash}{ext}"
+
+
+def _stored_path(key):
+    return f"blobs/{key[:2]}/{key}"
+
+
+def _text_path(stored_path):
+    return os.path.join(config.UPLOAD_DIR, f"{stored_path}.text")
+
+
+async def content_hash(stored_path):
+    """sha256 of the stored bytes (free for blobs, computed for legacy files)."""
+    if is_blob(stored_path):
+        return os.path.basename(stored_path)[:64]
+    return await asyncio.to_thread(file_sha256, os.path.join(config.UPLOAD_DIR, stored_path))
+
+
+# ---------------------------------------------------------------
+# STORE / RELEASE
+# ---------------------------------------------------------------
+
+# no owners left (records from before owner sets count references in "refs")
+_UNREFERENCED = {"$and": [
+    {"$or": [{"owners": {"$exists": False}}, {"owners": {"$size": 0}}]},
+    {"$or": [{"refs": {"$exists": False}}, {"refs": {"$lte": 0}}]},
+]}
+
+
+async def store(db, src_path, ext, owner):
+    """
+    Move `src_path` into the blob store (dropping it if the bytes already
+    exist) and add `owner` to its references. Returns the stored_path
+    relative to UPLOAD_DIR.
+    """
+    content_hash = await asyncio.to_thread(file_sha256, src_path)
+    key = _key(content_hash, ext.lower())
+    stored = _stored_path(key)
+    dest = os.path.join(config.UPLOAD_DIR, stored)
+
+    # reference first: from here on a concurrent release() of the last
+    # other owner can no longer delete the record, and if it already did
+    # it restores or leaves the file for us (see release)
+    await db.blobs.update_one(
+        {"_id": key},
+        {
+            "$addToSet": {"owners": owner},
+            "$setOnInsert": {
+                "content_hash": content_hash,
+                "stored_path": stored,
+                "size": os.path.getsize(src_path),
+                "created_at": datetime.utcnow(),
+            },
+        },
+        upsert=True,
+    )
+
+    if os.path.exists(dest):
+        os.remove(src_path)
+        metrics.cache_result("blob", True)
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src_path, dest)
+        metrics.cache_result("blob", False)
+    return stored
+
+
+async def release(db, stored_path, owner=None):
+    """
+    Drop `owner`'s reference (owner=None: one reference taken before owner
+    sets existed); delete the bytes and cached artefacts once nobody holds one.
+    """
+    if not is_blob(stored_path):
+        # legacy per-upload file
+        path = os.path.join(config.UPLOAD_DIR, stored_path)
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    key = os.path.basename(stored_path)
+    update = {"$pull": {"owners": owner}} if owner else {"$inc": {"refs": -1}}
+    blob = await db.blobs.find_one_and_update({"_id": key}, update, return_document=True)
+    if blob is None:
+        return
+
+    res = await db.blobs.delete_one({"_id": key, **_UNREFERENCED})
+    if res.deleted_count == 0:
+        return
+
+    # Move the bytes aside, then look again: a store() that raced with the
+    # delete may have re-created the record after seeing the file and
+    # dropping its own copy, in which case the file goes back.
+    path = os.path.join(config.UPLOAD_DIR, stored_path)
+    trash = temp_path(".deleted")
+    try:
+        os.replace(path, trash)
+    except FileNotFoundError:
+        trash = None
+
+    if await db.blobs.find_one({"_id": key}, {"_id": 1}):
+        if trash:
+            if os.path.exists(path):
+                os.remove(trash)
+            else:
+                os.replace(trash, path)
+        return
+
+    for p in [trash, _text_path(stored_path),
+              *glob.glob(os.path.join(PREVIEW_DIR, f"{blob['content_hash']}_*"))]:
+        if not p:
+            continue
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+# ---------------------------------------------------------------
+# SHARED EXTRACTION
+# ---------------------------------------------------------------
+
+async def get_extraction(db, stored_path):
+    """
+    Extracted text + fingerprint for a stored file, computed once per blob.
+    Returns the same shape as extract_text().
+    """
+    path = os.path.join(config.UPLOAD_DIR, stored_path)
+    ext = os.path.splitext(path)[1].lower()
+
+    if not is_blob(stored_path):
+        return await asyncio.to_thread(extract_text, path, ext)
+
+    cached = await get_cached_extraction(db, stored_path)
+    if cached:
+        return cached
+
+    extracted = await asyncio.to_thread(extract_text, path, ext)
+    await save_extraction(db, stored_path, extracted)
+    return extracted
+
+
+async def get_cached_extraction(db, stored_path):
+    """Extraction saved by an earlier upload of the same bytes, or None."""
+    if not is_blob(stored_path):
+        return None
+
+    blob = await db.blobs.find_one({"_id": os.path.basename(stored_path)}, {"fingerprint": 1})
+    text_path = _text_path(stored_path)
+
+    if blob and blob.get("fingerprint") and os.path.exists(text_path):
+        metrics.cache_result("extraction", True)
+        with open(text_path, "r", encoding="utf-8") as f:
+            return {"text": f.read(), "fingerprint": blob["fingerprint"]}
+
+    metrics.cache_result("extraction", False)
+    return None
+
+
+async def save_extraction(db, stored_path, extracted):
+    if not is_blob(stored_path):
+        return
+    with open(_text_path(stored_path), "w", encoding="utf-8") as f:
+        f.write(extracted["text"])
+    await db.blobs.update_one({"_id": os.path.basename(stored_path)},
+                              {"$set": {"fingerprint": extracted["fingerprint"]}})
@@ -1,4 +1,6 @@
 # backend/app/chat.py
+import asyncio
+import logging
 import os
 from datetime import datetime
 from typing import Optional
@@ -7,15 +9,18 @@ from fastapi import APIRouter, Depends, HTTPException
 from bson import ObjectId
 
 from .deps import get_mongo_client, get_current_user
-from . import config
+from .pagination import paginate
+from .context import count_tokens, truncate_tokens, observe_prompt
+from . import config, metrics
 
 # OpenRouter/OpenAI bridge (optional)
 from openai import OpenAI as OpenAIClient
 
 router = APIRouter()
+log = logging.getLogger("idp.chat")
 openrouter = None
 if getattr(config, "OPENROUTER_API_KEY", None):
-    openrouter = OpenAIClient(base_url="https://openrouter.ai/api/v1", api_key=config.OPENROUTER_API_KEY)
+    openrouter = OpenAIClient(base_url=config.OPENROUTER_BASE_URL, api_key=config.OPENROUTER_API_KEY)
 
 # Helper to safely extract text content from LLM response
 def _llm_text_from_response(resp):
@@ -30,6 +35,100 @@ def _llm_text_from_response(resp):
             return str(resp)
 
 
+# -----------------------------
+#  Rolling summary + token-budgeted prompt
+# -----------------------------
+# chat docs carry "summary" (of messages[:summary_upto]) and "summary_upto";
+# the last CHAT_KEEP_RECENT messages are never folded into the summary.
+
+_summary_tasks = {}
+
+
+def _format_message(m):
+    text = truncate_tokens(m.get("text") or "", config.CHAT_MESSAGE_MAX_TOKENS)
+    return f"{(m.get('role') or 'user').upper()}: {text}"
+
+
+def _build_chat_prompt(chat, user_msg):
+    """Summary of older turns + as many recent turns as fit CHAT_PROMPT_TOKEN_BUDGET."""
+    current = _format_message({"role": "user", "text": user_msg})
+    summary = chat.get("summary")
+    head = f"CONVERSATION SUMMARY:\n{summary}" if summary else None
+
+    budget = config.CHAT_PROMPT_TOKEN_BUDGET - count_tokens(current) - count_tokens(head or "")
+    recent = []
+    for m in reversed(chat.get("messages", [])[chat.get("summary_upto", 0):]):
+        line = _format_message(m)
+        cost = count_tokens(line)
+        if cost > budget:
+            break
+        budget -= cost
+        recent.append(line)
+
+    parts = ([head] if head else []) + recent[::-1] + [current]
+    return "\n\n".join(parts)
+
+
+def _needs_summary(chat, messages):
+    pending = messages[chat.get("summary_upto", 0):len(messages) - config.CHAT_KEEP_RECENT]
+    return sum(count_tokens(m.get("text") or "") for m in pending) >= config.CHAT_SUMMARY_TRIGGER_TOKENS
+
+
+def _schedule_summary(db, oid):
+    if not openrouter or oid in _summary_tasks:
+        return
+    task = asyncio.create_task(_refresh_summary(db, oid))
+    _summary_tasks[oid] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(oid, None))
+
+
+async def _refresh_summary(db, oid):
+    """Fold messages older than the recent window into the chat's summary (background)."""
+    try:
+        chat = await db.chats.find_one({"_id": oid}, {"messages": 1, "summary": 1, "summary_upto": 1})
+        if not chat:
+            return
+        messages = chat.get("messages", [])
+        upto = chat.get("summary_upto", 0)
+        end = len(messages) - config.CHAT_KEEP_RECENT
+        if end <= upto:
+            return
+
+        transcript = "\n\n".join(_format_message(m) for m in messages[upto:end])
+        max_words = config.CHAT_SUMMARY_MAX_TOKENS * 3 // 4
+        prompt = f"""
+Update the running summary of a conversation between a user and an assistant.
+
+EXISTING SUMMARY:
+{chat.get("summary") or "(none)"}
+
+NEW MESSAGES:
+{transcript}
+
+Return only the updated summary, at most {max_words} words. Keep names, numbers,
+decisions, document references and open questions.
+"""
+        observe_prompt("chat_summary", prompt)
+        with metrics.timer("llm_summary"):
+            resp = await asyncio.to_thread(
+                openrouter.chat.completions.create,
+                model="mistralai/mixtral-8x7b-instruct",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=config.CHAT_SUMMARY_MAX_TOKENS,
+            )
+        summary = truncate_tokens(_llm_text_from_response(resp).strip(), config.CHAT_SUMMARY_MAX_TOKENS)
+        if not summary:
+            return
+
+        # another worker may have refreshed it meanwhile; only move forward from what we read
+        await db.chats.update_one(
+            {"_id": oid, "summary_upto": {"$in": [upto, None] if upto == 0 else [upto]}},
+            {"$set": {"summary": summary, "summary_upto": end, "summary_updated_at": datetime.utcnow()}},
+        )
+    except Exception:
+        log.exception("chat summary refresh failed for %s", oid)
+
+
 # -----------------------------
 #  Start a new chat (and optionally get an immediate assistant reply)
 # -----------------------------
@@ -70,15 +169,17 @@ async def chat_start(payload: dict, current_user=Depends(get_current_user)):
     # Optionally ask the LLM immediately
     if openrouter:
         prompt = f"User: {user_msg}\n\nAnswer concisely."
+        observe_prompt("chat", prompt)
         try:
-            resp = openrouter.chat.completions.create(
-                model="mistralai/mixtral-8x7b-instruct",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=400
-            )
+            with metrics.timer("llm"):
+                resp = openrouter.chat.completions.create(
+                    model="mistralai/mixtral-8x7b-instruct",
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": prompt},
+                    ],
+                    max_tokens=400
+                )
             assistant_text = _llm_text_from_response(resp)
         except Exception as e:
             assistant_text = f"(LLM error: {e})"
@@ -137,25 +238,22 @@ async def chat_message(chat_id: str, payload: dict, current_user=Depends(get_cur
     user_msg_obj = {"role": "user", "text": user_msg, "ts": datetime.utcnow()}
     await db.chats.update_one({"_id": oid}, {"$push": {"messages": user_msg_obj}, "$set": {"updated_at": datetime.utcnow()}})
 
-    # Build a context by optionally including last few messages (you can tailor this)
-    history_msgs = chat.get("messages", [])[-8:]  # last few
-    context_strings = []
-    for m in history_msgs:
-        context_strings.append(f"{m.get('role').upper()}: {m.get('text')}")
-    context_strings.append(f"USER: {user_msg}")
-    prompt = "\n\n".join(context_strings)
+    # Rolling summary of older turns + recent turns, capped at CHAT_PROMPT_TOKEN_BUDGET
+    prompt = _build_chat_prompt(chat, user_msg)
 
     assistant_text = None
     if openrouter:
+        observe_prompt("chat", prompt)
         try:
-            resp = openrouter.chat.completions.create(
-                model="mistralai/mixtral-8x7b-instruct",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=400
-            )
+            with metrics.timer("llm"):
+                resp = openrouter.chat.completions.create(
+                    model="mistralai/mixtral-8x7b-instruct",
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": prompt},
+                    ],
+                    max_tokens=400
+                )
             assistant_text = _llm_text_from_response(resp)
         except Exception as e:
             assistant_text = f"(LLM error: {e})"
@@ -165,6 +263,10 @@ async def chat_message(chat_id: str, payload: dict, current_user=Depends(get_cur
     assistant_obj = {"role": "assistant", "text": assistant_text, "ts": datetime.utcnow()}
     await db.chats.update_one({"_id": oid}, {"$push": {"messages": assistant_obj}, "$set": {"updated_at": datetime.utcnow()}})
 
+    # refresh the summary off the request path once enough history has piled up
+    if _needs_summary(chat, chat.get("messages", []) + [user_msg_obj, assistant_obj]):
+        _schedule_summary(db, oid)
+
     # Optionally update chat title if it was untitled or based on first message
     # (we keep the title as-is for now)
 
@@ -181,21 +283,35 @@ async def chat_message(chat_id: str, payload: dict, current_user=Depends(get_cur
 #  List chats
 # -----------------------------
 @router.get("/chat/list")
-async def chat_list(current_user=Depends(get_current_user)):
+async def chat_list(
+    limit: int = config.PAGE_SIZE_DEFAULT,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user=Depends(get_current_user),
+):
     user_email = current_user["email"]
     client = get_mongo_client()
     db = client[config.MONGO_DB_NAME]
 
-    rows = await db.chats.find({"user": user_email}, {"title": 1, "created_at": 1, "updated_at": 1}).sort("updated_at", -1).to_list(200)
+    # most recently active first. updated_at moves while a client pages, so a
+    # chat that gets a new message can show up again on a later page or be
+    # missed until the next refresh; clients dedupe by chat_id.
+    page = await paginate(
+        db.chats,
+        {"user": user_email},
+        sort_field="updated_at",
+        projection={"title": 1, "created_at": 1, "updated_at": 1},
+        limit=limit, cursor=cursor, include_total=include_total,
+    )
     output = []
-    for r in rows:
+    for r in page["rows"]:
         output.append({
             "chat_id": str(r["_id"]),
             "title": r.get("title"),
             "created_at": (r.get("created_at").isoformat() if isinstance(r.get("created_at"), datetime) else r.get("created_at")),
             "updated_at": (r.get("updated_at").isoformat() if isinstance(r.get("updated_at"), datetime) else r.get("updated_at"))
         })
-    return {"chats": output}
+    return {"chats": output, "next_cursor": page["next_cursor"], "total": page["total"]}
 
 
 # -----------------------------
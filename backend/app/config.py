@@ -14,5 +14,89 @@ MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "idp_idp")
 # OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 FAISS_DIR = os.getenv("FAISS_DIR", "./faiss_data")
+TESSERACT_CMD = os.getenv(
+    "TESSERACT_CMD",
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe" if os.name == "nt" else "tesseract"
+)
+
+# Document compare (track changes)
+DIFF_BLOCK_LIMIT = int(os.getenv("DIFF_BLOCK_LIMIT", "4000000"))   # max word pairs diffed inside one changed block
+DIFF_MAX_WORDS = int(os.getenv("DIFF_MAX_WORDS", "300000"))         # above this only a similarity estimate is returned
+DIFF_CACHE_SIZE = int(os.getenv("DIFF_CACHE_SIZE", "128"))
+
+# Retrieval (hybrid BM25 + FAISS)
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "5"))   # candidates per ranker = top_k * this
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))     # retrieved context per /ask prompt
+CONTEXT_PASSAGE_TOKENS = int(os.getenv("CONTEXT_PASSAGE_TOKENS", "200"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))   # shingle overlap treated as duplicate
+CONTEXT_CHARS_PER_TOKEN = int(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+
+# Chat prompts (rolling summary + recent turns)
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "1500"))
+CHAT_MESSAGE_MAX_TOKENS = int(os.getenv("CHAT_MESSAGE_MAX_TOKENS", "400"))        # per message inside a prompt
+CHAT_KEEP_RECENT = int(os.getenv("CHAT_KEEP_RECENT", "4"))                        # messages never folded into the summary
+CHAT_SUMMARY_TRIGGER_TOKENS = int(os.getenv("CHAT_SUMMARY_TRIGGER_TOKENS", "1000"))  # unsummarized history before a refresh
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+INDEX_SERVICE_SOCKET = os.getenv("INDEX_SERVICE_SOCKET", "")             # set to route index reads/writes through app/index_service.py
+INDEX_SERVICE_TIMEOUT = float(os.getenv("INDEX_SERVICE_TIMEOUT", "30"))
+INDEX_SERVICE_MAX_OPEN = int(os.getenv("INDEX_SERVICE_MAX_OPEN", "64"))   # indexes kept in memory by the service
+INDEX_WAL_MAX_RECORDS = int(os.getenv("INDEX_WAL_MAX_RECORDS", "64"))      # commits logged before a full snapshot
+INDEX_WAL_MAX_BYTES = int(os.getenv("INDEX_WAL_MAX_BYTES", str(32 * 1024 * 1024)))
+INDEX_FSYNC = os.getenv("INDEX_FSYNC", "1") == "1"
+
+# Embeddings
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_DIM = int(os.getenv("EMBED_DIM", "384"))                       # MiniLM-L6-v2 → 384-dim embeddings
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "sentence-transformers")  # "sentence-transformers" | "onnx"
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "./onnx_model")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "1") == "1"
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))            # cross-request micro-batch size
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))       # latency budget before a partial batch is flushed
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(os.getcwd(), "embedding_cache.sqlite"))   # shared by ingest + reindex
+REINDEX_WORKERS = int(os.getenv("REINDEX_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", "256"))         # texts per pool task
+
+# Uploads + background ingestion jobs
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.getcwd(), "uploads"))
+INGEST_INLINE_WORKER = os.getenv("INGEST_INLINE_WORKER", "1") == "1"    # run a worker inside the API process
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))           # running jobs are reclaimed after this
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_FAILED_RETENTION_HOURS = float(os.getenv("JOB_FAILED_RETENTION_HOURS", "72"))  # failed jobs keep their files for retry this long
+JOB_SWEEP_SECONDS = float(os.getenv("JOB_SWEEP_SECONDS", "600"))        # how often idle workers discard expired failed jobs
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "5000"))               # per bulk job
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(2 * 1024 ** 3)))   # uncompressed archive contents per bulk job
+BULK_EXTRACT_WORKERS = int(os.getenv("BULK_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+
+# List endpoints (keyset pagination)
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+LIST_PREVIEW_CHARS = int(os.getenv("LIST_PREVIEW_CHARS", "300"))
+
+# Document viewer
+VIEW_CACHE_MAX_AGE = int(os.getenv("VIEW_CACHE_MAX_AGE", "3600"))     # seconds browsers may reuse a file without revalidating
+PREVIEW_ON_INGEST = os.getenv("PREVIEW_ON_INGEST", "1") == "1"        # pre-render the first page thumbnail
+PREVIEW_WIDTH = int(os.getenv("PREVIEW_WIDTH", "480"))
+PREVIEW_MAX_WIDTH = int(os.getenv("PREVIEW_MAX_WIDTH", "1600"))
+PREVIEW_DPI = int(os.getenv("PREVIEW_DPI", "100"))
+
+# Admission control (per process; see app/admission.py)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMIT_QUEUE_TIMEOUT = float(os.getenv("ADMIT_QUEUE_TIMEOUT", "10"))     # max seconds a request waits for a slot
+ADMIT_MAX_QUEUE = int(os.getenv("ADMIT_MAX_QUEUE", "32"))               # waiting requests per endpoint class
+ADMIT_MAX_BUCKETS = int(os.getenv("ADMIT_MAX_BUCKETS", "10000"))
+ADMIT_UPLOAD_CONCURRENCY = int(os.getenv("ADMIT_UPLOAD_CONCURRENCY", "4"))
+ADMIT_UPLOAD_RATE = float(os.getenv("ADMIT_UPLOAD_RATE", "0.5"))        # requests/second per user
+ADMIT_UPLOAD_BURST = int(os.getenv("ADMIT_UPLOAD_BURST", "10"))
+ADMIT_LLM_CONCURRENCY = int(os.getenv("ADMIT_LLM_CONCURRENCY", "8"))
+ADMIT_LLM_RATE = float(os.getenv("ADMIT_LLM_RATE", "0.2"))
+ADMIT_LLM_BURST = int(os.getenv("ADMIT_LLM_BURST", "5"))
+ADMIT_COMPARE_CONCURRENCY = int(os.getenv("ADMIT_COMPARE_CONCURRENCY", "2"))
+ADMIT_COMPARE_RATE = float(os.getenv("ADMIT_COMPARE_RATE", "0.2"))
+ADMIT_COMPARE_BURST = int(os.getenv("ADMIT_COMPARE_BURST", "3"))
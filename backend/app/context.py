@@ -0,0 +1,167 @@
+# app/context.py
+"""
+Token-budgeted context assembly for LLM prompts.
+
+Retrieved documents are cut into passages, scored against the question,
+deduplicated and packed greedily into a fixed token budget, so prompt
+size (and LLM latency) no longer grows with document length.
+"""
+import math
+import re
+
+from . import config, metrics
+from .lexical import tokenize
+
+_PARA_RE = re.compile(r"\n\s*\n+")
+_SENT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English with
+    BPE-style tokenizers). Deliberately model-agnostic: it only has to
+    keep prompts predictably sized, not match the provider's billing.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / config.CONTEXT_CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, on a word boundary."""
+    max_chars = max_tokens * config.CONTEXT_CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > max_chars // 2 else cut).rstrip() + " …"
+
+
+def observe_prompt(endpoint, prompt):
+    """Record the size of a prompt sent to the LLM; returns the token estimate."""
+    n = count_tokens(prompt)
+    metrics.PROMPT_TOKENS.observe(n, endpoint=endpoint)
+    return n
+
+
+# ---------------------------------------------------------------
+# PASSAGES
+# ---------------------------------------------------------------
+
+def split_passages(text, max_tokens=None):
+    """
+    Split text into passages of at most ~max_tokens, keeping paragraphs
+    together where possible and falling back to sentences, then words.
+    """
+    max_tokens = max_tokens or config.CONTEXT_PASSAGE_TOKENS
+    pieces = []
+    for para in _PARA_RE.split(text):
+        para = " ".join(para.split())
+        if not para:
+            continue
+        if count_tokens(para) <= max_tokens:
+            pieces.append(para)
+            continue
+        for sent in _SENT_RE.split(para):
+            while count_tokens(sent) > max_tokens:
+                head = truncate_tokens(sent, max_tokens).removesuffix(" …")
+                pieces.append(head)
+                sent = sent[len(head):].strip()
+            if sent:
+                pieces.append(sent)
+
+    # pack small pieces back together up to the passage size
+    passages, current = [], ""
+    for piece in pieces:
+        joined = f"{current}\n{piece}" if current else piece
+        if current and count_tokens(joined) > max_tokens:
+            passages.append(current)
+            current = piece
+        else:
+            current = joined
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _shingles(text, n=5):
+    toks = tokenize(text)
+    if len(toks) < n:
+        return {" ".join(toks)} if toks else set()
+    return {" ".join(toks[i:i + n]) for i in range(len(toks) - n + 1)}
+
+
+def _is_duplicate(shingles, selected, threshold):
+    for other in selected:
+        if not shingles or not other:
+            continue
+        overlap = len(shingles & other) / min(len(shingles), len(other))
+        if overlap >= threshold:
+            return True
+    return False
+
+
+# ---------------------------------------------------------------
+# ASSEMBLY
+# ---------------------------------------------------------------
+
+def build_context(question, hits, budget=None):
+    """
+    Pack the most relevant passages of `hits` (ranked retrieval results
+    with "text" and "filename") into `budget` tokens.
+
+    Passages are scored by query-term overlap plus a bonus for the hit's
+    retrieval rank, near-duplicates (same text in several documents or
+    overlapping chunks) are dropped, and the survivors are emitted grouped
+    by document in retrieval order, in their original reading order.
+    Returns (context_text, stats).
+    """
+    budget = budget or config.CONTEXT_TOKEN_BUDGET
+    q_terms = set(tokenize(question))
+
+    candidates = []
+    for rank, hit in enumerate(hits):
+        for pos, passage in enumerate(split_passages(hit.get("text", ""))):
+            terms = tokenize(passage)
+            matched = sum(1 for t in terms if t in q_terms)
+            coverage = len(q_terms & set(terms)) / (len(q_terms) or 1)
+            score = coverage + matched / (len(terms) + 1) + 1.0 / (rank + 2)
+            candidates.append((score, rank, pos, passage))
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+
+    header_tokens = {}
+    chosen, chosen_shingles = [], []
+    used = dropped_dupes = 0
+    for score, rank, pos, passage in candidates:
+        shingles = _shingles(passage)
+        if _is_duplicate(shingles, chosen_shingles, config.CONTEXT_DEDUP_THRESHOLD):
+            dropped_dupes += 1
+            continue
+
+        # each document costs a one-line source header the first time it appears
+        header = 0 if rank in header_tokens else count_tokens(f"[{hits[rank].get('filename', '')}]") + 1
+        cost = count_tokens(passage) + header
+        if used + cost > budget:
+            continue
+
+        used += cost
+        header_tokens[rank] = header
+        chosen.append((rank, pos, passage))
+        chosen_shingles.append(shingles)
+
+    chosen.sort()
+    blocks, last_rank = [], None
+    for rank, pos, passage in chosen:
+        if rank != last_rank:
+            blocks.append(f"[{hits[rank].get('filename', 'document')}]")
+            last_rank = rank
+        blocks.append(passage)
+
+    stats = {
+        "tokens": used,
+        "passages": len(chosen),
+        "candidates": len(candidates),
+        "duplicates": dropped_dupes,
+    }
+    return "\n\n".join(blocks), stats
@@ -4,14 +4,14 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from pydantic import BaseModel
-from . import config
+from . import config, metrics
 
 _client = None
 
 def get_mongo_client():
     global _client
     if _client is None:
-        _client = AsyncIOMotorClient(config.MONGODB_URI)
+        _client = AsyncIOMotorClient(config.MONGODB_URI, event_listeners=[metrics.MongoCommandListener()])
     return _client
 
 # ---- SWITCHED TO ARGON2 ----
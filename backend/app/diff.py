@@ -0,0 +1,142 @@
+# app/diff.py
+import re
+import threading
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+
+from . import config
+
+# Paragraph / sentence boundaries used to anchor the diff before going
+# down to word level.
+_SEGMENT_SPLIT = re.compile(r"\n+|(?<=[.!?;:])\s+")
+
+
+# ---------------------------------------------------------------
+# SEGMENTING
+# ---------------------------------------------------------------
+
+def _segments(text: str):
+    """
+    Split text into paragraph/sentence segments, each a tuple of words.
+    Tuples are hashable so SequenceMatcher can compare whole segments.
+    """
+    segs = []
+    for part in _SEGMENT_SPLIT.split(text):
+        words = part.split()
+        if words:
+            segs.append(tuple(words))
+    return segs
+
+
+def _flatten(segs):
+    return [w for s in segs for w in s]
+
+
+# ---------------------------------------------------------------
+# QUICK SIMILARITY ESTIMATE
+# ---------------------------------------------------------------
+
+def _common_words(words_a, words_b):
+    """Words the two sides share, ignoring order (an upper bound of the matched words)."""
+    return sum((Counter(words_a) & Counter(words_b)).values())
+
+
+def estimate_similarity(text_a: str, text_b: str) -> float:
+    """
+    Linear-time upper bound of the word-level similarity
+    (bag-of-words overlap, same idea as SequenceMatcher.quick_ratio).
+    """
+    words_a = text_a.split()
+    words_b = text_b.split()
+    total = len(words_a) + len(words_b)
+    if total == 0:
+        return 100.0
+    return 200.0 * _common_words(words_a, words_b) / total
+
+
+# ---------------------------------------------------------------
+# ANCHORED DIFF
+# ---------------------------------------------------------------
+
+def _append(chunks, op, a_words, b_words):
+    a = " ".join(a_words) or None
+    b = " ".join(b_words) or None
+    # merge with the previous chunk when the op is the same
+    if chunks and chunks[-1]["op"] == op:
+        prev = chunks[-1]
+        if a:
+            prev["a"] = f"{prev['a']} {a}" if prev["a"] else a
+        if b:
+            prev["b"] = f"{prev['b']} {b}" if prev["b"] else b
+        return
+    chunks.append({"op": op, "a": a, "b": b})
+
+
+def compute_diff_chunks(text_a: str, text_b: str):
+    """
+    Two-level diff: segments (paragraphs/sentences) are matched first,
+    then only changed blocks are diffed word by word. Blocks larger than
+    DIFF_BLOCK_LIMIT word pairs are reported as a single replace and
+    counted with the bag-of-words estimate, which makes the result
+    approximate.
+
+    Returns (similarity %, chunks, approximate); chunks have the same
+    shape as a plain word level SequenceMatcher diff.
+    """
+    segs_a = _segments(text_a)
+    segs_b = _segments(text_b)
+
+    total = sum(map(len, segs_a)) + sum(map(len, segs_b))
+    if total == 0:
+        return 100.0, [], False
+
+    matched = 0
+    approximate = False
+    chunks = []
+
+    sm = SequenceMatcher(None, segs_a, segs_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        words_a = _flatten(segs_a[i1:i2])
+        words_b = _flatten(segs_b[j1:j2])
+
+        if tag == "equal":
+            matched += len(words_a)
+            _append(chunks, "equal", words_a, words_b)
+        elif tag == "replace" and len(words_a) * len(words_b) <= config.DIFF_BLOCK_LIMIT:
+            inner = SequenceMatcher(None, words_a, words_b)
+            for op, a1, a2, b1, b2 in inner.get_opcodes():
+                if op == "equal":
+                    matched += a2 - a1
+                _append(chunks, op, words_a[a1:a2], words_b[b1:b2])
+        elif tag == "replace":
+            matched += _common_words(words_a, words_b)
+            approximate = True
+            _append(chunks, tag, words_a, words_b)
+        else:
+            _append(chunks, tag, words_a, words_b)
+
+    return 200.0 * matched / total, chunks, approximate
+
+
+# ---------------------------------------------------------------
+# CACHE (per document pair, keyed by content fingerprints)
+# ---------------------------------------------------------------
+
+_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def cache_get(key):
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+        return hit
+
+
+def cache_put(key, value):
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > config.DIFF_CACHE_SIZE:
+            _cache.popitem(last=False)
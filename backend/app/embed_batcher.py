@@ -0,0 +1,114 @@
+# app/embed_batcher.py
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import config, metrics
+from .embeddings import get_embedder
+
+
+class _Request:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+
+
+class EmbeddingBatcher:
+    """
+    Collects encode requests from every handler thread and runs them through
+    the embedding provider as one batch. A batch is flushed when it holds
+    max_batch texts or when the oldest request has waited max_wait_ms.
+    Callers get a concurrent.futures.Future (or await aencode()).
+    """
+
+    def __init__(self, provider=None, max_batch=None, max_wait_ms=None):
+        self.provider = provider or get_embedder()
+        self.max_batch = max_batch or config.EMBED_MAX_BATCH
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.EMBED_MAX_WAIT_MS) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------------------
+
+    def submit(self, texts) -> Future:
+        self._ensure_started()
+        req = _Request(list(texts))
+        self._queue.put(req)
+        return req.future
+
+    def encode(self, texts):
+        return self.submit(texts).result()
+
+    async def aencode(self, texts):
+        return await asyncio.wrap_future(self.submit(texts))
+
+    # ---------------------------------------------------------------
+    # WORKER THREAD
+    # ---------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                req = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(req)
+            size += len(req.texts)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [r for r in self._collect() if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            texts = [t for r in batch for t in r.texts]
+            metrics.EMBED_BATCH_SIZE.observe(len(texts))
+            try:
+                with metrics.timer("embed_batch"):
+                    vecs = self.provider.encode(texts)
+            except Exception as e:
+                for r in batch:
+                    r.future.set_exception(e)
+                continue
+
+            start = 0
+            for r in batch:
+                r.future.set_result(vecs[start:start + len(r.texts)])
+                start += len(r.texts)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher()
+    return _batcher
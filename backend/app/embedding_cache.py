@@ -0,0 +1,99 @@
+# app/embedding_cache.py
+"""
+Persistent embedding cache (SQLite) keyed by (model, sha256 of text).
+
+The one place vectors are cached: ingestion looks passages up here before
+encoding and stores what it encodes, and the reindex command reuses the
+same entries, so a passage is encoded once per model no matter how often
+it is uploaded (by any user) or reindexed. Point EMBED_CACHE_PATH at
+storage shared by the API, workers and reindex runs.
+"""
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from . import config, metrics
+
+_CHUNK = 500        # stay well under SQLite's bound-parameter limit
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """One SQLite connection per thread (handlers use it via asyncio.to_thread)."""
+
+    def __init__(self, path=None):
+        self.path = path or config.EMBED_CACHE_PATH
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        self._conn()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # several processes write concurrently: wait for the lock instead of failing
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vec BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            conn.commit()
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def get_many(self, model, hashes):
+        """{text_hash: vector} for the hashes already encoded with `model`."""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(hashes), _CHUNK):
+            chunk = hashes[start:start + _CHUNK]
+            rows = conn.execute(
+                f"SELECT text_hash, vec FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                [model, *chunk],
+            )
+            for h, blob in rows:
+                found[h] = np.frombuffer(blob, dtype="float32")
+        metrics.CACHE_REQUESTS.inc(len(found), cache="embedding", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(hashes) - len(found), cache="embedding", result="miss")
+        return found
+
+    def put_many(self, model, items):
+        """Store (text_hash, vector) pairs for `model`."""
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vec) VALUES (?, ?, ?)",
+            [(model, h, np.asarray(v, dtype="float32").tobytes()) for h, v in items],
+        )
+        conn.commit()
+
+    def close(self):
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,175 @@
+# app/embeddings.py
+import os
+import threading
+
+import numpy as np
+
+from . import config
+
+# ---------------------------------------------------------------
+# PROVIDERS
+# ---------------------------------------------------------------
+
+class EmbeddingProvider:
+    """
+    Interface every embedding backend implements.
+    encode() returns a float32 array of shape (len(texts), dim).
+    Heavy imports and model loading happen on first use, not on import.
+    """
+    name = "base"
+    dim = config.EMBED_DIM
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _encode(self, texts):
+        raise NotImplementedError
+
+    def load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+
+    def encode(self, texts):
+        self.load()
+        if not texts:
+            return np.zeros((0, self.dim), dtype="float32")
+        return np.asarray(self._encode(list(texts)), dtype="float32")
+
+    def warmup(self):
+        """Load the model and run one tiny batch so the first request is fast."""
+        self.encode(["warmup"])
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+
+    def __init__(self, model_name=None):
+        super().__init__()
+        self.model_name = model_name or config.EMBED_MODEL_NAME
+        self.name = self.model_name
+        self._model = None
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(self.model_name)
+
+    def _encode(self, texts):
+        return self._model.encode(texts, batch_size=config.EMBED_BATCH_SIZE, convert_to_numpy=True)
+
+
+class OnnxProvider(EmbeddingProvider):
+    """
+    CPU backend running an exported (optionally int8-quantized) copy of the
+    sentence-transformers model through onnxruntime. Mean pooling and L2
+    normalisation reproduce the sentence-transformers pipeline.
+    Create the model directory with export_onnx().
+    """
+
+    def __init__(self, model_dir=None):
+        super().__init__()
+        self.model_dir = model_dir or config.EMBED_ONNX_DIR
+        self.name = f"{config.EMBED_MODEL_NAME}:onnx:{os.path.basename(os.path.normpath(self.model_dir))}"
+        self._session = None
+        self._tokenizer = None
+
+    def _load(self):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_file = os.path.join(self.model_dir, "model_int8.onnx")
+        if not os.path.exists(model_file):
+            model_file = os.path.join(self.model_dir, "model.onnx")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_file, opts, providers=["CPUExecutionProvider"])
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def _encode(self, texts):
+        out = []
+        for start in range(0, len(texts), config.EMBED_BATCH_SIZE):
+            batch = texts[start:start + config.EMBED_BATCH_SIZE]
+            enc = self._tokenizer(batch, padding=True, truncation=True, max_length=256, return_tensors="np")
+            feeds = {k: v.astype("int64") for k, v in enc.items() if k in self._input_names}
+            hidden = self._session.run(None, feeds)[0]
+
+            mask = enc["attention_mask"][..., None].astype("float32")
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out.append(pooled)
+        return np.vstack(out)
+
+
+# ---------------------------------------------------------------
+# SINGLETON
+# ---------------------------------------------------------------
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedder() -> EmbeddingProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if config.EMBED_BACKEND == "onnx":
+                    _provider = OnnxProvider()
+                else:
+                    _provider = SentenceTransformerProvider()
+    return _provider
+
+
+def warmup():
+    get_embedder().warmup()
+
+
+# ---------------------------------------------------------------
+# ONNX EXPORT
+# ---------------------------------------------------------------
+
+def export_onnx(out_dir, model_name=None, quantize=True):
+    """
+    Export the transformer part of the sentence-transformers model to ONNX
+    and, optionally, write a dynamically int8-quantized copy next to it.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    model_name = model_name or config.EMBED_MODEL_NAME
+    os.makedirs(out_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(out_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    names = [n for n in names if n in sample]
+    axes = {n: {0: "batch", 1: "seq"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[n] for n in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=14,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, os.path.join(out_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    return out_dir
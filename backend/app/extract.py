@@ -3,11 +3,16 @@ import pdfplumber
 import docx
 import pytesseract
 from PIL import Image
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+from . import config, metrics
+pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_CMD
+
+SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md", ".docx", ".png", ".jpg", ".jpeg"}
 
 def fingerprint_text(text):
     return hashlib.md5(text.encode()).hexdigest()
 
+@metrics.timed("extract")
 def extract_text(path, ext):
     ext = ext.lower()
     text = ""
@@ -1,89 +1,427 @@
+import base64
 import os
 import json
+import threading
+from contextlib import contextmanager
+
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-# MiniLM-L6-v2 → 384-dim embeddings
-EMBED_MODEL = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+try:
+    import fcntl
+except ImportError:         # Windows: in-process locking only
+    fcntl = None
+
+from . import config, metrics
+from .embeddings import get_embedder
+from .embed_batcher import get_batcher
+from .lexical import BM25Index, reciprocal_rank_fusion
 
 BASE_DIR = os.path.join(os.getcwd(), "vectorstores")
 os.makedirs(BASE_DIR, exist_ok=True)
 
 
+def list_users():
+    """Emails of every user with a store on disk."""
+    return sorted(
+        name[:-len("_docs")].replace("_at_", "@")
+        for name in os.listdir(BASE_DIR)
+        if name.endswith("_docs") and os.path.isdir(os.path.join(BASE_DIR, name))
+    )
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _write_lock(safe):
+    """
+    Serialize writers of one user's store: a thread lock for handlers and
+    inline workers in this process, plus an flock on {safe}.lock for other
+    processes (python -m app.worker) where the platform has one.
+    """
+    with _locks_guard:
+        lock = _locks.setdefault(safe, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(BASE_DIR, f"{safe}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _fsync_write(path, data, mode="w"):
+    with open(path, mode) as f:
+        f.write(data)
+        f.flush()
+        if config.INDEX_FSYNC:
+            os.fsync(f.fileno())
+
+
+def _fsync_path(path):
+    """fsync a file written by someone else (faiss), or a directory after a rename."""
+    if not config.INDEX_FSYNC:
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:          # directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 class FaissManager:
+    """
+    Per-user FAISS + BM25 store.
+
+    On disk a store is a versioned snapshot (index, metadata and lexical
+    files sharing one version id, published by atomically replacing
+    {safe}.manifest.json) plus a write-ahead log of documents added since.
+    Commits only append to the log; a new snapshot is taken once the log
+    grows past INDEX_WAL_MAX_RECORDS / INDEX_WAL_MAX_BYTES, and loading
+    replays the log on top of the snapshot.
+    """
+
     def __init__(self, user_email):
         safe = user_email.replace("@", "_at_")
+        self.safe = safe
 
-        # FAISS index path
-        self.index_path = os.path.join(BASE_DIR, f"{safe}.index")
-
-        # Metadata path
-        self.meta_path = os.path.join(BASE_DIR, f"{safe}.json")
+        # Snapshot manifest (points at the current versioned files) + write-ahead log
+        self.manifest_path = os.path.join(BASE_DIR, f"{safe}.manifest.json")
+        self.wal_path = os.path.join(BASE_DIR, f"{safe}.wal")
 
         # Per-user text storage directory
         self.text_dir = os.path.join(BASE_DIR, f"{safe}_docs")
         os.makedirs(self.text_dir, exist_ok=True)
 
+        rebuilt = self._load()
+
+        # persist the rebuild (only after replay, which is tied to the current version)
+        if rebuilt and self.metadata:
+            with _write_lock(self.safe):
+                self._catch_up()
+                self.snapshot()
+
+    def _load(self):
+        """Read the current snapshot and replay the log; True if the lexical index had to be rebuilt."""
+        self._load_snapshot()
+
+        # Rebuild the lexical index for stores created before it existed
+        rebuilt = self.lexical is None or len(self.lexical) != len(self.metadata)
+        if rebuilt:
+            self.lexical = self._rebuild_lexical()
+
+        self.wal_records = 0
+        self.wal_offset = 0
+        self._replay_wal()
+        return rebuilt
+
+    def _manifest_version(self):
+        if not os.path.exists(self.manifest_path):
+            return 0
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)["version"]
+
+    def _catch_up(self):
+        """
+        Bring this instance up to date with writes from other instances
+        (other threads, workers or processes). Called with the write lock held.
+        """
+        if self._manifest_version() != self.version:
+            self._load()
+        else:
+            self._replay_wal(truncate=True)
+
+    # ---------------------------------------------------------------
+    # SNAPSHOTS
+    # ---------------------------------------------------------------
+
+    def _paths(self, version):
+        base = os.path.join(BASE_DIR, f"{self.safe}.v{version}")
+        return {"index": f"{base}.index", "meta": f"{base}.json", "lex": f"{base}.bm25.json"}
+
+    def _load_snapshot(self, attempts=3):
+        """
+        Load the version the manifest points at. Writers keep the previous
+        version on disk, but a reader that falls further behind can still
+        find its files gone; it then re-reads the manifest and tries again.
+        """
+        for _ in range(attempts):
+            try:
+                return self._read_snapshot()
+            except (FileNotFoundError, RuntimeError):     # faiss raises RuntimeError for a missing file
+                if self._manifest_version() == self.version:
+                    raise
+        raise FileNotFoundError(f"Snapshot files for {self.safe} keep disappearing")
+
+    def _read_snapshot(self):
+        manifest = None
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+
+        if manifest:
+            self.version = manifest["version"]
+            paths = {k: os.path.join(BASE_DIR, v) for k, v in manifest["files"].items()}
+            missing = [p for p in paths.values() if not os.path.exists(p)]
+            if missing:
+                # never fall back to an empty store for a published version
+                raise FileNotFoundError(f"Snapshot v{self.version} is missing {missing}")
+        else:
+            # stores written before snapshots: unversioned files, migrated on the next snapshot
+            self.version = 0
+            paths = self._legacy_paths()
+
         # Load or create FAISS index
-        if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
+        if os.path.exists(paths["index"]):
+            self.index = faiss.read_index(paths["index"])
         else:
-            self.index = faiss.IndexFlatL2(384)
+            self.index = faiss.IndexFlatL2(get_embedder().dim)
 
         # Load or create metadata JSON
-        if os.path.exists(self.meta_path):
-            with open(self.meta_path, "r") as f:
+        if os.path.exists(paths["meta"]):
+            with open(paths["meta"], "r") as f:
                 self.metadata = json.load(f)
         else:
             self.metadata = []
+        self.doc_ids = {m.get("doc_id") for m in self.metadata}
+
+        self.lexical = BM25Index.load(paths["lex"])
+
+    def _legacy_paths(self):
+        return {
+            "index": os.path.join(BASE_DIR, f"{self.safe}.index"),
+            "meta": os.path.join(BASE_DIR, f"{self.safe}.json"),
+            "lex": os.path.join(BASE_DIR, f"{self.safe}.bm25.json"),
+        }
+
+    def snapshot(self):
+        """
+        Write a new version of index + metadata + lexical files next to the
+        current one, publish it by renaming the manifest into place, then
+        reset the log. Called with the write lock held, so no other writer
+        can append to the log between the snapshot and the reset.
+
+        The previous version stays on disk for readers that loaded the old
+        manifest just before the rename; the one before it is removed.
+        """
+        version = self.version + 1
+        paths = self._paths(version)
+
+        with metrics.timer("index_snapshot"):
+            faiss.write_index(self.index, paths["index"])
+            _fsync_path(paths["index"])
+            _fsync_write(paths["meta"], json.dumps(self.metadata))
+            _fsync_write(paths["lex"], json.dumps(self.lexical.to_dict()))
+
+            manifest = {"version": version, "files": {k: os.path.basename(v) for k, v in paths.items()}}
+            tmp = f"{self.manifest_path}.tmp"
+            _fsync_write(tmp, json.dumps(manifest))
+            os.replace(tmp, self.manifest_path)
+            _fsync_path(BASE_DIR)
+
+        # log records carry the version they apply on top of, so a crash
+        # before this reset only leaves records that replay skips
+        self.version = version
+        self._reset_wal()
+
+        stale = version - 2
+        if stale < 0:
+            return
+        for path in (self._paths(stale) if stale else self._legacy_paths()).values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ---------------------------------------------------------------
+    # WRITE-AHEAD LOG
+    # ---------------------------------------------------------------
+
+    def _reset_wal(self):
+        open(self.wal_path, "w").close()
+        self.wal_records = 0
+        self.wal_offset = 0
+
+    def _append_wal(self, metas, vecs):
+        record = {
+            "version": self.version,
+            "metas": metas,
+            "shape": list(vecs.shape),
+            "vecs": base64.b64encode(vecs.tobytes()).decode(),
+        }
+        # one write per record; a torn tail is detected and dropped on replay
+        line = (json.dumps(record) + "\n").encode()
+        _fsync_write(self.wal_path, line, mode="ab")
+        self.wal_records += 1
+        self.wal_offset += len(line)
+
+    def _replay_wal(self, truncate=False):
+        """
+        Apply log records written after self.wal_offset. A trailing partial
+        record is either still being appended by another writer or left by
+        a crash; it is only cut off when the caller holds the write lock.
+        """
+        if not os.path.exists(self.wal_path):
+            return
+
+        with open(self.wal_path, "rb") as f:
+            f.seek(self.wal_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.wal_offset += len(line)
+                if record["version"] != self.version:
+                    continue                    # already contained in the snapshot
+                vecs = np.frombuffer(base64.b64decode(record["vecs"]), dtype="float32").reshape(record["shape"])
+                self._apply(self.read_texts(record["metas"]), record["metas"], vecs)
+                self.wal_records += 1
+
+        if truncate and self.wal_offset < os.path.getsize(self.wal_path):
+            with open(self.wal_path, "r+b") as f:
+                f.truncate(self.wal_offset)
+
+    def read_texts(self, metas):
+        """Stored text for each metadata row ("" when the file is gone)."""
+        texts = []
+        for meta in metas:
+            path = meta.get("text_path")
+            if path and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    texts.append(f.read())
+            else:
+                texts.append("")
+        return texts
+
+    def _rebuild_lexical(self):
+        lex = BM25Index()
+        for i, text in enumerate(self.read_texts(self.metadata)):
+            lex.add(i, text)
+        return lex
+
+    def rebuild(self, vecs):
+        """
+        Replace every vector (same rows and metadata, e.g. after a model
+        change) and publish the result as one snapshot.
+        """
+        vecs = np.ascontiguousarray(np.asarray(vecs, dtype="float32"))
+        with _write_lock(self.safe):
+            self._catch_up()
+            if len(vecs) != len(self.metadata):
+                raise ValueError(f"Expected {len(self.metadata)} vectors, got {len(vecs)}")
+
+            index = faiss.IndexFlatL2(vecs.shape[1])
+            index.add(vecs)
+            self.index = index
+            self.lexical = self._rebuild_lexical()
+            self.snapshot()
 
     def save(self):
-        faiss.write_index(self.index, self.index_path)
-        with open(self.meta_path, "w") as f:
-            json.dump(self.metadata, f, indent=2)
+        """Commit: snapshot when the log is large, otherwise the log already holds the changes."""
+        wal_bytes = os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0
+        if (self.version == 0 or self.wal_records >= config.INDEX_WAL_MAX_RECORDS
+                or wal_bytes >= config.INDEX_WAL_MAX_BYTES):
+            self.snapshot()
 
     def embed(self, text):
-        vec = EMBED_MODEL.encode([text], convert_to_numpy=True)
-        return vec.astype("float32")
+        # batched together with concurrent requests from other handlers
+        with metrics.timer("embed"):
+            return get_batcher().encode([text])
+
+    def add_document(self, text, meta, vec=None):
+        self.add_documents([text], [meta], self.embed(text) if vec is None else vec)
+
+    def add_documents(self, texts, metas, vecs=None):
+        """
+        Add many documents with a single log append. Without precomputed
+        vectors the texts are encoded directly in large batches. Documents
+        whose doc_id is already in the store are skipped, so re-running an
+        interrupted ingest job does not duplicate rows.
+        """
+        if not texts:
+            return
 
-    def add_document(self, text, meta):
-        # Save text to a file so FAISS only holds vectors
-        doc_id = meta["doc_id"]
-        text_path = os.path.join(self.text_dir, f"{doc_id}.txt")
+        if vecs is None:
+            vecs = get_embedder().encode(texts)
 
-        with open(text_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        for text, meta in zip(texts, metas):
+            # Save text to a file so FAISS only holds vectors
+            text_path = os.path.join(self.text_dir, f"{meta['doc_id']}.txt")
 
-        meta["text_path"] = text_path
+            with open(text_path, "w", encoding="utf-8") as f:
+                f.write(text)
 
-        # Add vector
-        vec = self.embed(text)
-        self.index.add(vec)
+            meta["text_path"] = text_path
+
+        # Log first, then apply in memory; save() decides whether to snapshot.
+        # Other instances may have written since this one was loaded, so
+        # catch up under the lock before appending (row ids must not collide).
+        vecs = np.ascontiguousarray(np.asarray(vecs, dtype="float32"))
+        with _write_lock(self.safe):
+            self._catch_up()
+
+            # a retried job may have added some of these before it was interrupted
+            keep = [i for i, m in enumerate(metas) if m["doc_id"] not in self.doc_ids]
+            if not keep:
+                return
+            if len(keep) < len(metas):
+                texts = [texts[i] for i in keep]
+                metas = [metas[i] for i in keep]
+                vecs = vecs[keep]
+
+            self._append_wal(metas, vecs)
+            self._apply(texts, metas, vecs)
+            self.save()
+
+    def _apply(self, texts, metas, vecs):
+        # Add vectors + postings (both keyed by row position)
+        start = self.index.ntotal
+        for i, text in enumerate(texts):
+            self.lexical.add(start + i, text)
+        self.index.add(vecs)
 
         # Add metadata
-        self.metadata.append(meta)
-        self.save()
+        self.metadata.extend(metas)
+        self.doc_ids.update(m.get("doc_id") for m in metas)
 
     def query(self, q, top_k=4):
         if len(self.metadata) == 0:
             return []
 
+        # Dense and lexical candidates, fused with reciprocal rank fusion
+        n_cand = min(self.index.ntotal, top_k * config.RETRIEVAL_CANDIDATES)
+
         q_vec = self.embed(q)
-        scores, ids = self.index.search(q_vec, top_k)
+        with metrics.timer("faiss_search"):
+            _, ids = self.index.search(q_vec, n_cand)
+        with metrics.timer("bm25_search"):
+            lex_hits = self.lexical.search(q, n_cand)
+
+        dense = [int(i) for i in ids[0] if 0 <= i < len(self.metadata)]
+        lexical = [i for i, _ in lex_hits if i < len(self.metadata)]
 
         results = []
 
-        for idx in ids[0]:
-            if idx < len(self.metadata):
-                item = self.metadata[idx]
-                with open(item["text_path"], "r", encoding="utf-8") as f:
-                    text = f.read()
-
-                results.append({
-                    "text": text,
-                    "score": float(scores[0][ids[0].tolist().index(idx)]),
-                    **item,
-                })
+        for idx, score in reciprocal_rank_fusion(dense, lexical)[:top_k]:
+            item = self.metadata[idx]
+            with open(item["text_path"], "r", encoding="utf-8") as f:
+                text = f.read()
+
+            results.append({
+                "text": text,
+                "score": score,
+                **item,
+            })
 
         return results
@@ -0,0 +1,123 @@
+# app/file_responses.py
+import hashlib
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from . import config
+
+CHUNK_SIZE = 256 * 1024
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------
+# CONDITIONAL REQUESTS
+# ---------------------------------------------------------------
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # strong comparison; tolerate W/ prefixes sent back by proxies
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags
+
+
+def _not_modified_since(header, mtime):
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def _parse_range(header, size):
+    """
+    Parse a single 'bytes=start-end' range. Returns (start, end) inclusive,
+    None when the header should be ignored (absent, malformed or multi-range),
+    or "invalid" when it cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[6:].strip().partition("-")
+    try:
+        if start_s == "":
+            length = int(end_s)                 # suffix range: last N bytes
+            if length == 0:
+                return "invalid"
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return "invalid"
+    return start, min(end, size - 1)
+
+
+def _iter_file(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def cached_file_response(request: Request, path, etag, filename=None, media_type=None):
+    """
+    Serve a file with a strong ETag, Last-Modified, 304 handling for
+    If-None-Match / If-Modified-Since and single byte-range (206) support.
+    """
+    stat = os.stat(path)
+    etag = f'"{etag}"'
+    media_type = media_type or mimetypes.guess_type(filename or path)[0] or "application/octet-stream"
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": f"private, max-age={config.VIEW_CACHE_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+    }
+
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        if _etag_matches(inm, etag):
+            return Response(status_code=304, headers=headers)
+    elif _not_modified_since(request.headers.get("if-modified-since"), stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    rng = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if rng and (if_range is None or if_range.strip() == etag):
+        parsed = _parse_range(rng, stat.st_size)
+        if parsed == "invalid":
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+        if parsed is not None:
+            start, end = parsed
+            length = end - start + 1
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+                "Content-Length": str(length),
+            })
+            if filename:
+                headers["Content-Disposition"] = f"inline; filename*=utf-8''{quote(filename)}"
+            return StreamingResponse(_iter_file(path, start, length), status_code=206,
+                                     media_type=media_type, headers=headers)
+
+    return FileResponse(path, filename=filename, media_type=media_type,
+                        headers=headers, content_disposition_type="inline")
@@ -0,0 +1,214 @@
+# app/index_service.py
+"""
+Shared index service. One process owns every user's FAISS/BM25 index,
+serializes writes per user and answers searches for all API workers and
+ingestion workers over a Unix socket:
+
+    cd backend
+    INDEX_SERVICE_SOCKET=/tmp/idp-index.sock python -m app.index_service
+
+When INDEX_SERVICE_SOCKET is set, get_index() returns an IndexClient
+(same add_document / add_documents / query interface as FaissManager);
+otherwise it returns a local FaissManager as before.
+
+Wire format: 4-byte big-endian length + JSON body, one request and one
+reply per frame. Vectors travel as base64 float32 bytes.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from . import config, metrics
+from .faiss_manager import FaissManager
+
+log = logging.getLogger("idp.index_service")
+
+_HEADER = struct.Struct("!I")
+
+
+class IndexServiceError(RuntimeError):
+    pass
+
+
+# ---------------------------------------------------------------
+# FRAMING
+# ---------------------------------------------------------------
+
+def _encode_vecs(vecs):
+    if vecs is None:
+        return None
+    arr = np.ascontiguousarray(np.asarray(vecs, dtype="float32"))
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1)
+    return {"shape": list(arr.shape), "data": base64.b64encode(arr.tobytes()).decode()}
+
+
+def _decode_vecs(payload):
+    if payload is None:
+        return None
+    arr = np.frombuffer(base64.b64decode(payload["data"]), dtype="float32")
+    return arr.reshape(payload["shape"])
+
+
+def _frame(obj):
+    body = json.dumps(obj).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise IndexServiceError("Index service closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+# ---------------------------------------------------------------
+# CLIENT (drop-in for FaissManager)
+# ---------------------------------------------------------------
+
+class IndexClient:
+    def __init__(self, user_email, socket_path=None):
+        self.user_email = user_email
+        self.socket_path = socket_path or config.INDEX_SERVICE_SOCKET
+
+    def _call(self, op, **args):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(config.INDEX_SERVICE_TIMEOUT)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                raise IndexServiceError(f"Index service unavailable at {self.socket_path}: {e}")
+
+            sock.sendall(_frame({"op": op, "user": self.user_email, **args}))
+            (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+            reply = json.loads(_recv_exact(sock, length))
+
+        if not reply.get("ok"):
+            raise IndexServiceError(reply.get("error") or "Index service error")
+        return reply.get("result")
+
+    def add_document(self, text, meta, vec=None):
+        self.add_documents([text], [meta], vec)
+
+    def add_documents(self, texts, metas, vecs=None):
+        if not texts:
+            return
+        # the service fills in text_path; mirror FaissManager, which mutates metas in place
+        stored = self._call("add", texts=texts, metas=metas, vecs=_encode_vecs(vecs))
+        for meta, new in zip(metas, stored):
+            meta.update(new)
+
+    def query(self, q, top_k=4):
+        return self._call("query", q=q, top_k=top_k)
+
+
+def get_index(user_email):
+    """Index handle for a user: the shared service when configured, else a local FaissManager."""
+    if config.INDEX_SERVICE_SOCKET:
+        return IndexClient(user_email)
+    return FaissManager(user_email)
+
+
+# ---------------------------------------------------------------
+# SERVER
+# ---------------------------------------------------------------
+
+class IndexService:
+    """Keeps recently used indexes in memory; one lock per user orders reads and writes."""
+
+    def __init__(self, max_open=None):
+        self.max_open = max_open or config.INDEX_SERVICE_MAX_OPEN
+        self._managers = OrderedDict()
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, user):
+        with self._guard:
+            return self._locks.setdefault(user, threading.Lock())
+
+    def _manager(self, user):
+        # called with the user's lock held
+        with self._guard:
+            mgr = self._managers.get(user)
+            if mgr is not None:
+                self._managers.move_to_end(user)
+                metrics.cache_result("index", True)
+                return mgr
+
+        metrics.cache_result("index", False)
+        mgr = FaissManager(user)
+        with self._guard:
+            self._managers[user] = mgr
+            while len(self._managers) > self.max_open:
+                # evicted indexes are already persisted; they are simply reloaded on next use
+                self._managers.popitem(last=False)
+        return mgr
+
+    def handle(self, req):
+        user = req.get("user")
+        if not user:
+            raise ValueError("Missing user")
+
+        with self._lock_for(user):
+            mgr = self._manager(user)
+            op = req.get("op")
+            if op == "add":
+                metas = req["metas"]
+                mgr.add_documents(req["texts"], metas, _decode_vecs(req.get("vecs")))
+                return metas
+            if op == "query":
+                return mgr.query(req["q"], top_k=int(req.get("top_k", 4)))
+        raise ValueError(f"Unknown op: {op}")
+
+    async def _serve_conn(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = _HEADER.unpack(header)
+                req = json.loads(await reader.readexactly(length))
+
+                try:
+                    with metrics.timer(f"index_{req.get('op')}"):
+                        result = await asyncio.to_thread(self.handle, req)
+                    reply = {"ok": True, "result": result}
+                except Exception as e:
+                    log.exception("index request failed")
+                    reply = {"ok": False, "error": str(e)}
+
+                writer.write(_frame(reply))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(self._serve_conn, path=socket_path)
+        os.chmod(socket_path, 0o660)
+        log.info("index service listening on %s", socket_path)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IDP shared index service")
+    parser.add_argument("--socket", default=config.INDEX_SERVICE_SOCKET or "/tmp/idp-index.sock")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(IndexService().serve(args.socket))
@@ -0,0 +1,414 @@
+# app/ingest.py
+import asyncio
+import multiprocessing
+import os
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from . import blobstore, config
+from .embed_batcher import get_batcher
+from .embedding_cache import get_cache, text_hash
+from .embeddings import get_embedder
+from .extract import extract_text, SUPPORTED_EXTENSIONS
+from .index_service import get_index
+from .previews import get_preview
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2")
+
+_extract_pool = None
+
+
+def _get_extract_pool():
+    global _extract_pool
+    if _extract_pool is None:
+        # spawn, not fork: the API process already runs threads (batcher, motor,
+        # anyio) and may have torch loaded, which forked children can deadlock on
+        _extract_pool = ProcessPoolExecutor(
+            max_workers=config.BULK_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _extract_pool
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+async def _noop_progress(stage):
+    pass
+
+
+async def ingest_upload(db, job, progress=_noop_progress):
+    """
+    Ingestion pipeline for one stored upload: extract, dedup check,
+    Mongo insert, embedding + FAISS persistence.
+    Extraction is reused from the shared blob and the vector from the
+    embedding cache when another upload already paid for them.
+    Safe to re-run for the same job after a failure (retries): the document
+    row is looked up by job_id, and the index skips a doc_id it already holds.
+    Returns {"doc_id", "duplicate"}.
+    """
+    user_email = job["user"]
+    filename = job["filename"]
+    stored_path = job["stored_path"]
+    file_path = os.path.join(config.UPLOAD_DIR, stored_path)
+
+    # an earlier attempt already found a duplicate and dropped its reference
+    if job.get("released"):
+        return {"doc_id": job.get("duplicate_of"), "duplicate": True}
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Upload missing on server: {stored_path}")
+
+    await progress("extracting")
+    extracted = await blobstore.get_extraction(db, stored_path)
+    fingerprint = extracted["fingerprint"]
+    content_hash = await blobstore.content_hash(stored_path)
+    text = extracted["text"].strip()
+
+    await progress("dedup")
+    # a previous attempt of this job may already have inserted the document
+    doc = await db.documents.find_one({"user": user_email, "job_id": job["_id"]})
+    if not doc:
+        existing = await db.documents.find_one({"user": user_email, "fingerprint": fingerprint})
+        if existing:
+            # record first so a retry can never release the blob twice
+            await db.ingest_jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"released": True, "duplicate_of": str(existing["_id"])}},
+            )
+            await blobstore.release(db, stored_path, job.get("blob_owner"))
+            return {"doc_id": str(existing["_id"]), "duplicate": True}
+
+        await progress("saving")
+        doc = {
+            "user": user_email,
+            "filename": filename,
+            "stored_path": stored_path,
+            "blob_owner": job.get("blob_owner"),       # the job's reference passes to the document
+            "fingerprint": fingerprint,
+            "content_hash": content_hash,
+            "text_snippet": text[:2000],
+            "job_id": job["_id"],
+            "created_at": datetime.utcnow(),
+        }
+        res = await db.documents.insert_one(doc)
+        doc["_id"] = res.inserted_id
+
+        if config.PREVIEW_ON_INGEST:
+            await asyncio.to_thread(_safe_preview, file_path, content_hash)
+
+    await progress("embedding")
+    model = get_embedder().name
+    h = text_hash(text)
+    vec = (await asyncio.to_thread(get_cache().get_many, model, [h])).get(h)
+    if vec is None:
+        vec = (await get_batcher().aencode([text]))[0]
+        await asyncio.to_thread(get_cache().put_many, model, [(h, vec)])
+
+    doc_id = str(doc["_id"])
+    await asyncio.to_thread(
+        lambda: get_index(user_email).add_document(
+            text,
+            {"doc_id": doc_id, "filename": filename, "text_path": file_path},
+            vec=vec.reshape(1, -1),
+        )
+    )
+
+    return {"doc_id": doc_id, "duplicate": False}
+
+
+# ---------------------------------------------------------------
+# BULK / ARCHIVE INGESTION
+# ---------------------------------------------------------------
+
+def _store_stream(src, filename, max_bytes):
+    """
+    Copy a file-like entry to a scratch file; it is moved into the blob store afterwards.
+    Counts the bytes actually written (archive headers can lie) and stops past max_bytes.
+    """
+    tmp = blobstore.temp_path(os.path.splitext(filename)[1].lower())
+    size = 0
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                break
+            out.write(chunk)
+    if size > max_bytes:
+        os.remove(tmp)
+        raise ValueError(f"Archive contents exceed {config.BULK_MAX_BYTES} bytes uncompressed")
+    return {"filename": filename, "tmp_path": tmp, "size": size}
+
+
+def _iter_archive(path):
+    """Yield (filename, file object) for every regular file in a zip/tar archive."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    with zf.open(info) as f:
+                        yield info.filename, f
+    else:
+        with tarfile.open(path, "r:*") as tf:
+            for member in tf:
+                if member.isfile():
+                    f = tf.extractfile(member)
+                    if f is not None:
+                        with f:
+                            yield member.name, f
+
+
+def unpack_archive(path, limit, max_bytes):
+    """
+    Stream supported entries of an archive into scratch files.
+    Only the base name of an entry is kept, so archive paths never touch the filesystem.
+    Raises ValueError (and removes what was written) once the entries
+    add up to more than max_bytes uncompressed.
+    """
+    entries = []
+    try:
+        for name, f in _iter_archive(path):
+            filename = os.path.basename(name)
+            if filename.startswith(".") or os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            if len(entries) >= limit:
+                break
+            entry = _store_stream(f, filename, max_bytes)
+            max_bytes -= entry["size"]
+            entries.append(entry)
+    except BaseException:
+        for e in entries:
+            os.remove(e["tmp_path"])
+        raise
+    return entries
+
+
+def _safe_extract(path, content_hash):
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        result = extract_text(path, ext)
+    except Exception as e:
+        return {"error": str(e)}
+    if config.PREVIEW_ON_INGEST:
+        _safe_preview(path, content_hash)
+    return result
+
+
+def _safe_preview(path, content_hash):
+    # previews are an optimisation: never fail ingestion because of one
+    try:
+        get_preview(path, content_hash)
+    except Exception:
+        pass
+
+
+async def ingest_bulk(db, job, progress=_noop_progress):
+    """
+    Batched pipeline for many files: unpack archives into the blob store,
+    extract what no other upload has extracted yet in a process pool,
+    dedup against the user's library and within the batch, embed missing
+    vectors in large batches, then commit with one insert_many and one
+    index write.
+    """
+    user_email = job["user"]
+    loop = asyncio.get_running_loop()
+
+    # 1) unpack + store as blobs (recorded on the job so a retry does not redo it)
+    await progress("unpacking")
+    entries = list(job.get("entries") or [])
+    archives = job.get("archives") or []
+
+    # unpack everything before storing, so hitting a limit stores nothing
+    unpacked = []
+    budget = config.BULK_MAX_BYTES
+    try:
+        for archive in archives:
+            archive_path = os.path.join(config.UPLOAD_DIR, archive)
+            if not os.path.exists(archive_path):
+                continue
+            limit = config.BULK_MAX_FILES - len(entries) - len(unpacked)
+            files = await asyncio.to_thread(unpack_archive, archive_path, limit, budget)
+            budget -= sum(e["size"] for e in files)
+            unpacked.extend(files)
+    except BaseException:
+        for e in unpacked:
+            os.remove(e["tmp_path"])
+        raise
+
+    # owners are derived from the job, so if we crash before recording the
+    # entries, the retry re-takes the same references instead of leaking them
+    for i, e in enumerate(unpacked):
+        ext = os.path.splitext(e["filename"])[1].lower()
+        owner = f"job:{job['_id']}:{i}"
+        entries.append({
+            "filename": e["filename"],
+            "stored_path": await blobstore.store(db, e["tmp_path"], ext, owner),
+            "owner": owner,
+        })
+    if archives:
+        await db.ingest_jobs.update_one({"_id": job["_id"]}, {"$set": {"entries": entries, "archives": []}})
+        for archive in archives:
+            archive_path = os.path.join(config.UPLOAD_DIR, archive)
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+
+    # 2) extract (shared extractions first, the rest in parallel)
+    await progress("extracting")
+    extracted = {}
+    todo = []
+    for e in entries:
+        cached = await blobstore.get_cached_extraction(db, e["stored_path"])
+        if cached:
+            extracted[e["stored_path"]] = cached
+        else:
+            todo.append(e["stored_path"])
+
+    todo = list(dict.fromkeys(todo))
+    hashes = [await blobstore.content_hash(sp) for sp in todo]
+    pool = _get_extract_pool()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, _safe_extract, os.path.join(config.UPLOAD_DIR, sp), h)
+        for sp, h in zip(todo, hashes)
+    ))
+    for sp, res in zip(todo, results):
+        if "error" not in res:
+            await blobstore.save_extraction(db, sp, res)
+        extracted[sp] = res
+
+    # 3) dedup
+    await progress("dedup")
+    failed = []
+    candidates = []
+    for entry in entries:
+        res = extracted[entry["stored_path"]]
+        if "error" in res:
+            failed.append({"filename": entry["filename"], "error": res["error"]})
+        else:
+            candidates.append((entry, res["fingerprint"], res["text"].strip()))
+
+    fingerprints = [c[1] for c in candidates]
+    known = {}
+    async for d in db.documents.find({"user": user_email, "fingerprint": {"$in": fingerprints}}, {"fingerprint": 1, "job_id": 1}):
+        known[d["fingerprint"]] = d
+
+    batch = []
+    release = [e for e in entries if "error" in extracted[e["stored_path"]]]
+    reused = {}         # fingerprint -> doc id inserted by an earlier attempt of this job
+    duplicates = 0
+    seen = set()
+    for entry, fp, text in candidates:
+        prev = known.get(fp)
+        if fp in seen or (prev and prev.get("job_id") != job["_id"]):
+            duplicates += 1
+            release.append(entry)
+            continue
+        seen.add(fp)
+        if prev:
+            reused[fp] = prev["_id"]
+        batch.append((entry, fp, text))
+
+    # forget dropped entries on the job before releasing, so a retry never releases twice
+    await db.ingest_jobs.update_one({"_id": job["_id"]}, {"$set": {"entries": [b[0] for b in batch]}})
+    for e in release:
+        await blobstore.release(db, e["stored_path"], e.get("owner"))
+
+    # 4) embed what the embedding cache does not already have, in large batches
+    await progress("embedding")
+    model = get_embedder().name
+    indexed = job.get("indexed")        # an earlier attempt got past the index write
+    texts = [b[2] for b in batch]
+    hashes = [] if indexed else [text_hash(t) for t in texts]
+    vec_by_hash = await asyncio.to_thread(get_cache().get_many, model, hashes)
+    missing = {}
+    for h, t in zip(hashes, texts):
+        if h not in vec_by_hash:
+            missing.setdefault(h, t)
+    if missing:
+        new_vecs = await asyncio.to_thread(get_embedder().encode, list(missing.values()))
+        new = list(zip(missing.keys(), new_vecs))
+        await asyncio.to_thread(get_cache().put_many, model, new)
+        vec_by_hash.update(new)
+
+    vecs = np.vstack([vec_by_hash[h] for h in hashes]) if hashes else None
+
+    # 5) one Mongo write + one index write
+    await progress("saving")
+    now = datetime.utcnow()
+    new_docs = [
+        {
+            "user": user_email,
+            "filename": entry["filename"],
+            "stored_path": entry["stored_path"],
+            "blob_owner": entry.get("owner"),
+            "fingerprint": fp,
+            "content_hash": await blobstore.content_hash(entry["stored_path"]),
+            "text_snippet": text[:2000],
+            "job_id": job["_id"],
+            "created_at": now,
+        }
+        for entry, fp, text in batch if fp not in reused
+    ]
+    inserted = iter((await db.documents.insert_many(new_docs)).inserted_ids if new_docs else [])
+    doc_ids = [str(reused[fp]) if fp in reused else str(next(inserted)) for _, fp, _ in batch]
+
+    metas = [
+        {"doc_id": doc_id, "filename": entry["filename"], "text_path": os.path.join(config.UPLOAD_DIR, entry["stored_path"])}
+        for doc_id, (entry, _, _) in zip(doc_ids, batch)
+    ]
+    # documents an earlier attempt already indexed are skipped by the store (same doc_id)
+    if not indexed:
+        await asyncio.to_thread(lambda: get_index(user_email).add_documents(texts, metas, vecs))
+        await db.ingest_jobs.update_one({"_id": job["_id"]}, {"$set": {"indexed": True}})
+
+    return {"added": len(doc_ids), "duplicates": duplicates, "failed": failed, "doc_ids": doc_ids}
+
+
+# ---------------------------------------------------------------
+# FAILED JOBS (kept for POST /jobs/{id}/retry until discarded)
+# ---------------------------------------------------------------
+
+async def discard_failed(db, query):
+    """
+    Discard permanently failed jobs matching `query`: drop the blob
+    references no inserted document took over, and unpacked archives.
+    Each job is switched from failed to discarded before anything is
+    released, so a concurrent retry or sweep never sees it half-released.
+    Returns the number of jobs discarded.
+    """
+    discarded = 0
+    while True:
+        job = await db.ingest_jobs.find_one_and_update(
+            {**query, "status": "failed"},
+            {"$set": {"status": "discarded", "lease_until": None, "updated_at": datetime.utcnow()}},
+        )
+        if job is None:
+            return discarded
+        discarded += 1
+
+        kept = {d.get("blob_owner") async for d in db.documents.find({"job_id": job["_id"]}, {"blob_owner": 1})}
+        if job.get("kind") == "upload":
+            held = [] if job.get("released") else [{"stored_path": job["stored_path"], "owner": job.get("blob_owner")}]
+        else:
+            held = job.get("entries") or []
+
+        for e in held:
+            if e.get("owner") not in kept:
+                await blobstore.release(db, e["stored_path"], e.get("owner"))
+        for archive in job.get("archives") or []:
+            path = os.path.join(config.UPLOAD_DIR, archive)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+async def discard_expired(db):
+    """Discard failed jobs nobody retried within JOB_FAILED_RETENTION_HOURS."""
+    cutoff = datetime.utcnow() - timedelta(hours=config.JOB_FAILED_RETENTION_HOURS)
+    return await discard_failed(db, {"updated_at": {"$lt": cutoff}})
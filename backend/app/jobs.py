@@ -0,0 +1,246 @@
+# app/jobs.py
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from .deps import get_mongo_client, get_current_user
+from . import config
+from .ingest import discard_failed
+from .pagination import paginate
+
+router = APIRouter()
+
+# Ordered pipeline stages per job kind, reported by GET /api/jobs/{job_id}
+STAGES = {
+    "upload": ["queued", "extracting", "dedup", "saving", "embedding", "done"],
+    "bulk": ["queued", "unpacking", "extracting", "dedup", "embedding", "saving", "done"],
+}
+
+
+def _progress(kind, stage):
+    stages = STAGES.get(kind, [])
+    if stage not in stages:
+        return 0.0
+    return round(stages.index(stage) / (len(stages) - 1), 2)
+
+
+# ---------------------------------------------------------------
+# QUEUE OPERATIONS (shared by the API and app/worker.py)
+# ---------------------------------------------------------------
+
+async def enqueue(db, user_email, kind, **fields):
+    now = datetime.utcnow()
+    job = {
+        "user": user_email,
+        "kind": kind,
+        "status": "queued",
+        "stage": "queued",
+        "attempts": 0,
+        "error": None,
+        "result": None,
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now,
+        **fields,
+    }
+    res = await db.ingest_jobs.insert_one(job)
+    return str(res.inserted_id)
+
+
+async def claim(db, worker_id):
+    """
+    Atomically take the oldest queued job, or a running job whose worker
+    stopped renewing its lease (crashed). Returns the job or None.
+    """
+    now = datetime.utcnow()
+    return await db.ingest_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {
+                "status": "running",
+                "worker": worker_id,
+                "lease_until": now + timedelta(seconds=config.JOB_LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+class LeaseLost(Exception):
+    """Another worker reclaimed the job after this worker's lease expired."""
+
+
+def _owned(job):
+    # claim() bumps attempts, so (worker, attempts) identifies one run of the job
+    return {"_id": job["_id"], "worker": job.get("worker"), "attempts": job.get("attempts")}
+
+
+async def renew(db, job):
+    """Extend the lease of a running job; False if this worker no longer owns it."""
+    now = datetime.utcnow()
+    res = await db.ingest_jobs.update_one(
+        {**_owned(job), "status": "running"},
+        {"$set": {"lease_until": now + timedelta(seconds=config.JOB_LEASE_SECONDS), "updated_at": now}},
+    )
+    return res.matched_count == 1
+
+
+async def set_stage(db, job, stage):
+    """Record stage progress and renew the lease; raises LeaseLost if the job was reclaimed."""
+    now = datetime.utcnow()
+    res = await db.ingest_jobs.update_one(
+        {**_owned(job), "status": "running"},
+        {"$set": {
+            "stage": stage,
+            "lease_until": now + timedelta(seconds=config.JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }},
+    )
+    if res.matched_count == 0:
+        raise LeaseLost(f"job {job['_id']} was reclaimed")
+
+
+async def complete(db, job, result):
+    res = await db.ingest_jobs.update_one(
+        _owned(job),
+        {"$set": {
+            "status": "done",
+            "stage": "done",
+            "result": result,
+            "error": None,
+            "lease_until": None,
+            "updated_at": datetime.utcnow(),
+        }},
+    )
+    return res.matched_count == 1
+
+
+async def fail(db, job, error):
+    """
+    Requeue until JOB_MAX_ATTEMPTS is reached, then mark failed.
+    Returns the new status, or None when another worker owns the job now.
+    """
+    status = "queued" if job.get("attempts", 0) < config.JOB_MAX_ATTEMPTS else "failed"
+    res = await db.ingest_jobs.update_one(
+        _owned(job),
+        {"$set": {
+            "status": status,
+            "error": str(error),
+            "lease_until": None,
+            "updated_at": datetime.utcnow(),
+        }},
+    )
+    return status if res.matched_count == 1 else None
+
+
+def job_view(job):
+    return {
+        "job_id": str(job["_id"]),
+        "kind": job.get("kind"),
+        "filename": job.get("filename"),
+        "status": job.get("status"),
+        "stage": job.get("stage"),
+        "progress": 1.0 if job.get("status") == "done" else _progress(job.get("kind"), job.get("stage")),
+        "attempts": job.get("attempts", 0),
+        "error": job.get("error"),
+        "result": job.get("result"),
+        "createdAt": job["created_at"].isoformat() if isinstance(job.get("created_at"), datetime) else None,
+        "updatedAt": job["updated_at"].isoformat() if isinstance(job.get("updated_at"), datetime) else None,
+    }
+
+
+# ---------------------------------------------------------------
+# JOB STATUS
+# ---------------------------------------------------------------
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str, current_user=Depends(get_current_user)):
+
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+
+    try:
+        oid = ObjectId(job_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+
+    job = await db.ingest_jobs.find_one({"_id": oid, "user": current_user["email"]})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_view(job)
+
+
+@router.get("/jobs")
+async def list_jobs(
+    limit: int = config.PAGE_SIZE_DEFAULT,
+    cursor: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+
+    page = await paginate(
+        db.ingest_jobs,
+        {"user": current_user["email"]},
+        sort_field="created_at",
+        projection={"entries": 0, "archives": 0},
+        limit=limit, cursor=cursor,
+    )
+    return {"jobs": [job_view(j) for j in page["rows"]], "next_cursor": page["next_cursor"]}
+
+
+# ---------------------------------------------------------------
+# RETRY FAILED JOB (file is still stored, no re-upload needed)
+# ---------------------------------------------------------------
+
+@router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str, current_user=Depends(get_current_user)):
+
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+
+    try:
+        oid = ObjectId(job_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+
+    job = await db.ingest_jobs.find_one_and_update(
+        {"_id": oid, "user": current_user["email"], "status": "failed"},
+        {"$set": {"status": "queued", "stage": "queued", "attempts": 0, "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not job:
+        if await db.ingest_jobs.find_one({"_id": oid, "user": current_user["email"], "status": "discarded"}, {"_id": 1}):
+            raise HTTPException(status_code=409, detail="Uploaded files were discarded, upload them again")
+        raise HTTPException(status_code=404, detail="No failed job with this id")
+
+    return job_view(job)
+
+
+# ---------------------------------------------------------------
+# DISCARD FAILED JOB (releases its stored files; otherwise they are
+# kept for JOB_FAILED_RETENTION_HOURS so the job can be retried)
+# ---------------------------------------------------------------
+
+@router.delete("/jobs/{job_id}")
+async def discard_job(job_id: str, current_user=Depends(get_current_user)):
+
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+
+    try:
+        oid = ObjectId(job_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+
+    if not await discard_failed(db, {"_id": oid, "user": current_user["email"]}):
+        raise HTTPException(status_code=404, detail="No failed job with this id")
+
+    return {"message": "Discarded", "job_id": job_id}
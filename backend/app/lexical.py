@@ -0,0 +1,104 @@
+# app/lexical.py
+import json
+import math
+import os
+import re
+from collections import Counter
+
+# Keeps identifiers like "AB-1234", "v2.1" or "user_id" as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Small incremental inverted index with Okapi BM25 scoring.
+    Document ids are the FAISS row positions, so both indexes stay aligned.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}      # term -> {doc_id: term frequency}
+        self.doc_len = {}       # doc_id -> number of tokens
+        self.total_len = 0
+
+    # ---------------------------------------------------------------
+    # BUILD
+    # ---------------------------------------------------------------
+
+    def add(self, doc_id: int, text: str):
+        tokens = tokenize(text)
+        key = str(doc_id)
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[key] = tf
+        self.doc_len[key] = len(tokens)
+        self.total_len += len(tokens)
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    # ---------------------------------------------------------------
+    # SEARCH
+    # ---------------------------------------------------------------
+
+    def search(self, q: str, top_k=10):
+        n = len(self.doc_len)
+        if n == 0:
+            return []
+
+        avg_len = self.total_len / n or 1.0
+        scores = {}
+
+        for term in set(tokenize(q)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for key, tf in plist.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[key] / avg_len)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        return [(int(k), s) for k, s in best]
+
+    # ---------------------------------------------------------------
+    # PERSISTENCE
+    # ---------------------------------------------------------------
+
+    def to_dict(self):
+        return {"postings": self.postings, "doc_len": self.doc_len}
+
+    @classmethod
+    def from_dict(cls, data):
+        idx = cls()
+        idx.postings = data.get("postings", {})
+        idx.doc_len = data.get("doc_len", {})
+        idx.total_len = sum(idx.doc_len.values())
+        return idx
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+def reciprocal_rank_fusion(*rankings, k=60):
+    """
+    Fuse ranked id lists: score(id) = sum(1 / (k + rank)).
+    Returns [(id, fused_score)] best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
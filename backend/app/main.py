@@ -1,12 +1,54 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, PlainTextResponse
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.routing import compile_path
 
 from . import auth, routes, users, config
-from . import chat
+from . import admission, chat, embeddings, jobs, metrics, worker
+from .deps import get_mongo_client
+from .pagination import ensure_indexes
 
 app = FastAPI(title="IDP Knowledge Assistant")
 
+
+# ------------------------------------------------------
+# Startup: load the embedding model before the first request
+# ------------------------------------------------------
+@app.on_event("startup")
+async def warmup_embeddings():
+    if config.EMBED_WARMUP:
+        await run_in_threadpool(embeddings.warmup)
+
+
+# ------------------------------------------------------
+# Startup: indexes for list pagination and the job queue
+# ------------------------------------------------------
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(get_mongo_client()[config.MONGO_DB_NAME])
+
+
+# ------------------------------------------------------
+# Startup: in-process ingestion worker (see app/worker.py)
+# ------------------------------------------------------
+@app.on_event("startup")
+async def start_ingest_worker():
+    if config.INGEST_INLINE_WORKER:
+        worker.start_inline(config.JOB_WORKER_CONCURRENCY)
+
+# ------------------------------------------------------
+# Admission control: per-user rate limits + per-endpoint concurrency
+# (registered before CORS so 429/503 responses still carry CORS headers)
+# ------------------------------------------------------
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    return await admission.admit(request, call_next)
+
 # ------------------------------------------------------
 # CORS
 # ------------------------------------------------------
@@ -18,6 +60,55 @@ app.add_middleware(
 )
 
 
+# ------------------------------------------------------
+# Per-endpoint latency + in-flight requests
+# ------------------------------------------------------
+_route_table = None
+
+
+def route_template(method, path):
+    """
+    Full route template (/api/jobs/{job_id}) for a request. Resolved before
+    the inner middleware runs, so responses they short-circuit (admission
+    429/503) are still attributed to their endpoint.
+    """
+    global _route_table
+    if _route_table is None:
+        entries = [("", r) for r in app.router.routes if isinstance(r, APIRoute)]
+        entries += [(prefix, r) for router, prefix in ROUTERS for r in router.routes]
+        _route_table = [(compile_path(prefix + r.path)[0], r.methods, prefix + r.path) for prefix, r in entries]
+
+    for regex, methods, template in _route_table:
+        if regex.match(path) and (not methods or method in methods):
+            return template
+    return None
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    metrics.HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    # label by route template, not the raw path (unbounded label values)
+    path = route_template(request.method, request.url.path) or "unmatched"
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=path)
+        metrics.HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+        metrics.HTTP_IN_FLIGHT.dec()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Prometheus text exposition of this worker's metrics.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ------------------------------------------------------
 # FIX 1: Prevent favicon.ico from triggering 401
 # ------------------------------------------------------
@@ -44,7 +135,12 @@ async def options_handler(path: str):
 # ------------------------------------------------------
 # Routers
 # ------------------------------------------------------
-app.include_router(auth.router)
-app.include_router(routes.router, prefix="/api")
-app.include_router(users.router)
-app.include_router(chat.router, prefix="/api")
+ROUTERS = [
+    (auth.router, ""),
+    (routes.router, "/api"),
+    (users.router, ""),
+    (chat.router, "/api"),
+    (jobs.router, "/api"),
+]
+for router, prefix in ROUTERS:
+    app.include_router(router, prefix=prefix)
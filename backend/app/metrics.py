@@ -0,0 +1,182 @@
+# app/metrics.py
+"""
+Minimal in-process metrics (counters, gauges, histograms) rendered in the
+Prometheus text format on GET /metrics. Every update is a dict lookup and
+an increment under a lock, so it is cheap enough to leave on.
+Values are per process: scrape each worker separately.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        for key, v in list(self._values.items()):
+            yield f"{self.name}{_label_str(self.labels, key)} {v}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        for key, v in list(self._values.items()):
+            yield f"{self.name}{_label_str(self.labels, key)} {v}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        for key, (counts, total, n) in list(self._values.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_label_str(self.labels + ('le',), key + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labels, key)} {total}"
+            yield f"{self.name}_count{_label_str(self.labels, key)} {n}"
+
+
+def render():
+    lines = []
+    for m in _registry:
+        lines.append(f"# HELP {m.name} {m.doc}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------
+# METRICS
+# ---------------------------------------------------------------
+
+HTTP_REQUESTS = Counter("idp_http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("idp_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("idp_http_requests_in_flight", "HTTP requests being served")
+
+STAGE_LATENCY = Histogram("idp_stage_duration_seconds", "Time spent per hot-path stage", ("stage",))
+STAGE_IN_FLIGHT = Gauge("idp_stage_in_flight", "Calls currently inside a stage", ("stage",))
+STAGE_ERRORS = Counter("idp_stage_errors_total", "Exceptions raised per stage", ("stage",))
+
+MONGO_LATENCY = Histogram("idp_mongo_command_duration_seconds", "MongoDB command latency", ("command",))
+
+CACHE_REQUESTS = Counter("idp_cache_requests_total", "Cache lookups", ("cache", "result"))
+EMBED_BATCH_SIZE = Histogram("idp_embed_batch_size", "Texts per embedding batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+ADMISSION_REJECTED = Counter("idp_admission_rejected_total", "Requests shed by admission control", ("policy", "reason"))
+ADMISSION_QUEUED = Gauge("idp_admission_queued", "Requests waiting for an admission slot", ("policy",))
+ADMISSION_WAIT = Histogram("idp_admission_wait_seconds", "Time spent waiting for an admission slot", ("policy",))
+PROMPT_TOKENS = Histogram("idp_llm_prompt_tokens", "Estimated prompt tokens sent to the LLM", ("endpoint",),
+                          buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768))
+
+
+# ---------------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------------
+
+@contextmanager
+def timer(stage):
+    """Time a block as `stage`, tracking in-flight calls and errors."""
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+
+
+def timed(stage):
+    """Decorator version of timer() for sync functions."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records the duration of every command sent by the Mongo client."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name)
+        STAGE_ERRORS.inc(stage=f"mongo_{event.command_name}")
@@ -0,0 +1,89 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from . import config
+
+
+# ---------------------------------------------------------------
+# CURSORS
+# ---------------------------------------------------------------
+
+def encode_cursor(value, oid):
+    if isinstance(value, datetime):
+        v = {"dt": value.isoformat()}
+    else:
+        v = {"v": value}
+    raw = json.dumps({**v, "id": str(oid)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = datetime.fromisoformat(data["dt"]) if "dt" in data else data.get("v")
+        return value, ObjectId(data["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def clamp_limit(limit):
+    if not limit or limit < 1:
+        return config.PAGE_SIZE_DEFAULT
+    return min(limit, config.PAGE_SIZE_MAX)
+
+
+# ---------------------------------------------------------------
+# KEYSET PAGINATION
+# ---------------------------------------------------------------
+
+async def paginate(collection, query, sort_field="_id", projection=None,
+                   limit=None, cursor=None, include_total=False):
+    """
+    Newest-first keyset pagination on (sort_field, _id).
+    Returns {"rows", "next_cursor", "total"}; next_cursor is None on the last page
+    and total is only counted when include_total is set.
+    """
+    limit = clamp_limit(limit)
+    page_query = dict(query)
+
+    if cursor:
+        value, oid = decode_cursor(cursor)
+        if sort_field == "_id":
+            page_query["_id"] = {"$lt": oid}
+        else:
+            page_query = {"$and": [query, {"$or": [
+                {sort_field: {"$lt": value}},
+                {sort_field: value, "_id": {"$lt": oid}},
+            ]}]}
+
+    sort = [("_id", -1)] if sort_field == "_id" else [(sort_field, -1), ("_id", -1)]
+
+    # one extra row tells us whether another page exists
+    rows = await collection.find(page_query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(None if sort_field == "_id" else last.get(sort_field), last["_id"])
+
+    total = await collection.count_documents(query) if include_total else None
+
+    return {"rows": rows, "next_cursor": next_cursor, "total": total}
+
+
+async def ensure_indexes(db):
+    """Compound indexes backing the keyset queries above."""
+    await db.documents.create_index([("user", 1), ("_id", -1)])
+    await db.documents.create_index([("user", 1), ("fingerprint", 1)])
+    # summaries / quizzes page on the immutable _id (regeneration rewrites created_at)
+    await db.summaries.create_index([("user", 1), ("_id", -1)])
+    await db.quizzes.create_index([("user", 1), ("_id", -1)])
+    await db.chats.create_index([("user", 1), ("updated_at", -1), ("_id", -1)])
+    await db.ingest_jobs.create_index([("status", 1), ("created_at", 1)])
@@ -0,0 +1,57 @@
+# app/previews.py
+import os
+
+from . import config, metrics
+
+PREVIEW_DIR = os.path.join(config.UPLOAD_DIR, "previews")
+os.makedirs(PREVIEW_DIR, exist_ok=True)
+
+PREVIEWABLE = {".pdf", ".png", ".jpg", ".jpeg"}
+
+
+def preview_path(content_hash, page, width):
+    return os.path.join(PREVIEW_DIR, f"{content_hash}_p{page}_w{width}.png")
+
+
+def _render(src_path, ext, page):
+    """Return a PIL image of one page of the document."""
+    if ext == ".pdf":
+        import pdfplumber
+        with pdfplumber.open(src_path) as pdf:
+            if page < 1 or page > len(pdf.pages):
+                return None
+            return pdf.pages[page - 1].to_image(resolution=config.PREVIEW_DPI).original.copy()
+
+    from PIL import Image
+    if page != 1:
+        return None
+    with Image.open(src_path) as img:
+        return img.convert("RGB")
+
+
+@metrics.timed("preview")
+def get_preview(src_path, content_hash, page=1, width=None):
+    """
+    Path of a cached PNG thumbnail for `page`, rendering it on first use.
+    Returns None when the file type or page has no preview.
+    """
+    width = width or config.PREVIEW_WIDTH
+    ext = os.path.splitext(src_path)[1].lower()
+    if ext not in PREVIEWABLE:
+        return None
+
+    out = preview_path(content_hash, page, width)
+    if os.path.exists(out):
+        metrics.cache_result("preview", True)
+        return out
+    metrics.cache_result("preview", False)
+
+    img = _render(src_path, ext, page)
+    if img is None:
+        return None
+
+    img.thumbnail((width, width * 4))
+    tmp = f"{out}.{os.getpid()}.tmp"
+    img.save(tmp, "PNG", optimize=True)
+    os.replace(tmp, out)
+    return out
@@ -0,0 +1,137 @@
+# app/reindex.py
+"""
+Rebuild per-user FAISS stores from their stored text, e.g. after changing
+the embedding model:
+
+    cd backend
+    python -m app.reindex                                  # every user, current model
+    python -m app.reindex --model sentence-transformers/all-mpnet-base-v2 --workers 4
+    python -m app.reindex --user alice@example.com
+
+Texts are encoded in large batches across a process pool; vectors are kept
+in the embedding cache ingestion also fills (app/embedding_cache.py), so
+passages already encoded with the target model, at upload time or by an
+earlier (possibly interrupted) run, are not encoded again. Each store is swapped in with one atomic snapshot.
+
+Run it while ingestion is paused (and against the index service's data
+directory with the service stopped); writes that land during a reindex
+are lost. When switching models, set EMBED_MODEL_NAME / EMBED_DIM for the
+API and workers to match.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import config
+from .embedding_cache import get_cache, text_hash
+from .embeddings import get_embedder
+from .faiss_manager import FaissManager, list_users
+
+log = logging.getLogger("idp.reindex")
+
+
+# ---------------------------------------------------------------
+# POOL WORKERS
+# ---------------------------------------------------------------
+
+def _init_worker(model_name, backend, threads):
+    # must run before torch / onnxruntime are imported (spawned processes)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    config.EMBED_MODEL_NAME = model_name
+    config.EMBED_BACKEND = backend
+    get_embedder().load()
+
+
+def _encode_chunk(texts):
+    return get_embedder().encode(texts)
+
+
+# ---------------------------------------------------------------
+# REINDEX
+# ---------------------------------------------------------------
+
+def _encode_missing(pool, texts, batch_size):
+    chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if pool is None:
+        return np.vstack([_encode_chunk(c) for c in chunks])
+    return np.vstack(list(pool.map(_encode_chunk, chunks)))
+
+
+def reindex_user(user_email, cache, pool, batch_size):
+    store = FaissManager(user_email)
+    if not store.metadata:
+        return {"user": user_email, "docs": 0, "encoded": 0}
+
+    model = get_embedder().name
+    texts = store.read_texts(store.metadata)
+    hashes = [text_hash(t) for t in texts]
+
+    cached = cache.get_many(model, hashes)
+    missing = {}
+    for h, t in zip(hashes, texts):
+        if h not in cached and h not in missing:
+            missing[h] = t
+
+    if missing:
+        vecs = _encode_missing(pool, list(missing.values()), batch_size)
+        new = list(zip(missing.keys(), vecs))
+        cache.put_many(model, new)
+        cached.update(new)
+
+    store.rebuild(np.vstack([cached[h] for h in hashes]))
+    return {"user": user_email, "docs": len(texts), "encoded": len(missing)}
+
+
+def main(users=None, model=None, backend=None, workers=None, batch_size=None):
+    if model:
+        config.EMBED_MODEL_NAME = model
+    if backend:
+        config.EMBED_BACKEND = backend
+    workers = workers if workers is not None else config.REINDEX_WORKERS
+    batch_size = batch_size or config.REINDEX_BATCH_SIZE
+
+    users = users or list_users()
+    cache = get_cache()
+    pool = None
+    if workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config.EMBED_MODEL_NAME, config.EMBED_BACKEND, threads),
+        )
+
+    log.info("reindexing %d store(s) with %s", len(users), get_embedder().name)
+    try:
+        for user in users:
+            start = time.perf_counter()
+            try:
+                res = reindex_user(user, cache, pool, batch_size)
+            except Exception:
+                log.exception("reindex failed for %s", user)
+                continue
+            log.info("%s: %d docs, %d encoded, %.1fs",
+                     res["user"], res["docs"], res["encoded"], time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-user FAISS stores")
+    parser.add_argument("--user", action="append", help="only this user (repeatable)")
+    parser.add_argument("--model", help="embedding model (default EMBED_MODEL_NAME)")
+    parser.add_argument("--backend", help="embedding backend (default EMBED_BACKEND)")
+    parser.add_argument("--workers", type=int, help="encoding processes (1 = in-process)")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    main(args.user, args.model, args.backend, args.workers, args.batch_size)
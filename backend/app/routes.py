@@ -1,21 +1,25 @@
 # app/routes.py
 import os
-import uuid
+import shutil
 from datetime import datetime
 from typing import Optional, Any
 
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Request
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from bson import ObjectId
 from jose import JWTError, jwt
-from difflib import SequenceMatcher
 from pydantic import BaseModel
 from openai import OpenAI as OpenAIClient
 
 from .deps import get_mongo_client, get_current_user
-from .extract import extract_text
-from .faiss_manager import FaissManager
-from . import config
+from .extract import SUPPORTED_EXTENSIONS
+from .index_service import get_index
+from .context import build_context, observe_prompt
+from .ingest import is_archive
+from .pagination import paginate
+from .file_responses import cached_file_response, file_sha256
+from .previews import get_preview
+from . import blobstore, config, diff, jobs, metrics
 
 # ---------------------------------------------------------------
 # Router + Config
@@ -25,38 +29,21 @@ router = APIRouter()
 openrouter = None
 if getattr(config, "OPENROUTER_API_KEY", None):
     openrouter = OpenAIClient(
-        base_url="https://openrouter.ai/api/v1",
+        base_url=config.OPENROUTER_BASE_URL,
         api_key=config.OPENROUTER_API_KEY
     )
 
-UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
+UPLOAD_DIR = config.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # ---------------------------------------------------------------
 # TRACK CHANGES (COMPARE)
 # ---------------------------------------------------------------
 
-def compute_diff_chunks(text_a: str, text_b: str):
-    words_a = text_a.split()
-    words_b = text_b.split()
-
-    sm = SequenceMatcher(None, words_a, words_b)
-    similarity = sm.ratio() * 100.0
-
-    chunks = []
-    for tag, i1, i2, j1, j2 in sm.get_opcodes():
-        chunks.append({
-            "op": tag,
-            "a": " ".join(words_a[i1:i2]) or None,
-            "b": " ".join(words_b[j1:j2]) or None,
-        })
-
-    return similarity, chunks
-
-
 class CompareRequest(BaseModel):
     doc_id_a: str
     doc_id_b: str
+    quick: bool = False     # only return a fast similarity estimate
 
 
 class DiffChunk(BaseModel):
@@ -68,6 +55,7 @@ class DiffChunk(BaseModel):
 class CompareResponse(BaseModel):
     similarity: float
     chunks: list[DiffChunk]
+    approximate: bool = False
 
 
 @router.post("/documents/compare", response_model=CompareResponse)
@@ -95,16 +83,33 @@ async def compare_documents(payload: CompareRequest, current_user=Depends(get_cu
     if not os.path.exists(path_a) or not os.path.exists(path_b):
         raise HTTPException(status_code=404, detail="Files missing on server")
 
-    text_a = extract_text(path_a, os.path.splitext(path_a)[1].lower()).get("text", "")
-    text_b = extract_text(path_b, os.path.splitext(path_b)[1].lower()).get("text", "")
+    key = (doc_a.get("fingerprint"), doc_b.get("fingerprint"), payload.quick)
+    cached = diff.cache_get(key) if all(key[:2]) else None
+    metrics.cache_result("diff", cached is not None)
+    if cached is None:
+        text_a = (await blobstore.get_extraction(db, doc_a["stored_path"])).get("text", "")
+        text_b = (await blobstore.get_extraction(db, doc_b["stored_path"])).get("text", "")
+        cached = await run_in_threadpool(_compare_texts, text_a, text_b, payload.quick)
+        if all(key[:2]):
+            diff.cache_put(key, cached)
 
-    similarity, chunks = compute_diff_chunks(text_a, text_b)
+    similarity, chunks, approximate = cached
 
     return CompareResponse(
         similarity=round(similarity, 2),
-        chunks=[DiffChunk(**c) for c in chunks]
+        chunks=[DiffChunk(**c) for c in chunks],
+        approximate=approximate
     )
 
+
+def _compare_texts(text_a: str, text_b: str, quick: bool):
+    """Diff two extracted texts (runs in a worker thread)."""
+    n_words = len(text_a.split()) + len(text_b.split())
+    if quick or n_words > config.DIFF_MAX_WORDS:
+        return diff.estimate_similarity(text_a, text_b), [], True
+
+    return diff.compute_diff_chunks(text_a, text_b)
+
 # ---------------------------------------------------------------
 # JWT HELPER
 # ---------------------------------------------------------------
@@ -125,33 +130,44 @@ def _email_from_token(token: Optional[str]) -> Optional[str]:
 # ---------------------------------------------------------------
 
 @router.get("/documents")
-async def get_documents(current_user=Depends(get_current_user)):
+async def get_documents(
+    limit: int = config.PAGE_SIZE_DEFAULT,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user=Depends(get_current_user),
+):
     user_email = current_user["email"]
 
     client = get_mongo_client()
     db = client[config.MONGO_DB_NAME]
 
-    docs = await db.documents.find(
+    page = await paginate(
+        db.documents,
         {"user": user_email},
-        {"filename": 1, "stored_path": 1}
-    ).to_list(200)
+        projection={"filename": 1, "stored_path": 1},
+        limit=limit, cursor=cursor, include_total=include_total,
+    )
 
     return {
         "documents": [
             {"_id": str(d["_id"]), "filename": d["filename"], "stored_path": d["stored_path"]}
-            for d in docs
-        ]
+            for d in page["rows"]
+        ],
+        "next_cursor": page["next_cursor"],
+        "total": page["total"],
     }
 
 # ---------------------------------------------------------------
 # VIEW DOCUMENT
 # ---------------------------------------------------------------
 
-@router.get("/documents/view/{doc_id}")
-async def view_document(doc_id: str, request: Request, authorization: Optional[str] = Header(None)):
-
-    token = authorization or request.query_params.get("token")
-    email = _email_from_token(token)
+async def _doc_for_token(doc_id: str, authorization: Optional[str]):
+    """
+    Auth via the Authorization header only: tokens in the query string end
+    up in access logs, browser history and Referer headers. The frontend
+    fetches files with the header and opens them from a blob URL.
+    """
+    email = _email_from_token(authorization)
 
     if not email:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -172,7 +188,37 @@ async def view_document(doc_id: str, request: Request, authorization: Optional[s
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File missing")
 
-    return FileResponse(file_path, filename=doc["filename"])
+    # documents ingested before content hashes were stored get one on first view
+    if not doc.get("content_hash"):
+        doc["content_hash"] = await run_in_threadpool(file_sha256, file_path)
+        await db.documents.update_one({"_id": oid}, {"$set": {"content_hash": doc["content_hash"]}})
+
+    return doc, file_path
+
+
+@router.get("/documents/view/{doc_id}")
+async def view_document(doc_id: str, request: Request, authorization: Optional[str] = Header(None)):
+
+    doc, file_path = await _doc_for_token(doc_id, authorization)
+
+    return cached_file_response(request, file_path, doc["content_hash"], filename=doc["filename"])
+
+# ---------------------------------------------------------------
+# PAGE PREVIEW (PNG thumbnail, cached on disk)
+# ---------------------------------------------------------------
+
+@router.get("/documents/preview/{doc_id}")
+async def preview_document(doc_id: str, request: Request, page: int = 1, width: Optional[int] = None,
+                           authorization: Optional[str] = Header(None)):
+
+    doc, file_path = await _doc_for_token(doc_id, authorization)
+
+    width = max(16, min(width or config.PREVIEW_WIDTH, config.PREVIEW_MAX_WIDTH))
+    path = await run_in_threadpool(get_preview, file_path, doc["content_hash"], page, width)
+    if not path:
+        raise HTTPException(status_code=404, detail="No preview available")
+
+    return cached_file_response(request, path, f"{doc['content_hash']}-p{page}-w{width}", media_type="image/png")
 
 # ---------------------------------------------------------------
 # DELETE DOCUMENT
@@ -197,12 +243,11 @@ async def delete_document(doc_id: str, current_user=Depends(get_current_user)):
 
     await db.documents.delete_one({"_id": oid})
 
-    file_path = os.path.join(UPLOAD_DIR, doc["stored_path"])
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except:
-            pass
+    # blobs are shared across users; the bytes go when the last reference does
+    try:
+        await blobstore.release(db, doc["stored_path"], doc.get("blob_owner"))
+    except:
+        pass
 
     return {"message": "Deleted"}
 
@@ -216,40 +261,76 @@ async def upload_file(file: UploadFile = File(...), current_user=Depends(get_cur
     user_email = current_user["email"]
 
     ext = os.path.splitext(file.filename)[1].lower()
-    stored_filename = f"{uuid.uuid4()}{ext}"
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
+
+    tmp_path = blobstore.temp_path(ext)
+    with open(tmp_path, "wb") as f:
+        await run_in_threadpool(shutil.copyfileobj, file.file, f, 1024 * 1024)
+
+    client = get_mongo_client()
+    db = client[config.MONGO_DB_NAME]
+
+    # identical bytes (from any user) share one blob on disk; the reference
+    # belongs to the job, then to the document it creates
+    owner = blobstore.new_owner()
+    stored_path = await blobstore.store(db, tmp_path, ext, owner)
+
+    # extraction, dedup and indexing run in the ingestion worker (app/worker.py)
+    job_id = await jobs.enqueue(db, user_email, "upload", filename=file.filename,
+                                stored_path=stored_path, blob_owner=owner)
+
+    return {"message": "Queued", "job_id": job_id, "status_url": f"/api/jobs/{job_id}"}
 
-    file_path = os.path.join(UPLOAD_DIR, stored_filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+# ---------------------------------------------------------------
+# BULK UPLOAD (archive and/or many files → one ingest job)
+# ---------------------------------------------------------------
+
+@router.post("/upload/bulk")
+async def upload_bulk(files: list[UploadFile] = File(...), current_user=Depends(get_current_user)):
 
-    extracted = extract_text(file_path, ext)
-    fingerprint = extracted["fingerprint"]
-    text = extracted["text"].strip()
+    user_email = current_user["email"]
+
+    # archive members are capped while unpacking; plain files are capped here
+    if len(files) > config.BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files (max {config.BULK_MAX_FILES})")
 
     client = get_mongo_client()
     db = client[config.MONGO_DB_NAME]
 
-    existing = await db.documents.find_one({"user": user_email, "fingerprint": fingerprint})
-    if existing:
-        os.remove(file_path)
-        return {"message": "Duplicate upload", "duplicate": True}
-
-    doc = {
-        "user": user_email,
-        "filename": file.filename,
-        "stored_path": stored_filename,
-        "fingerprint": fingerprint,
-        "text_snippet": text[:2000]
-    }
+    archives = []
+    entries = []
 
-    res = await db.documents.insert_one(doc)
+    for file in files:
+        if is_archive(file.filename):
+            ext = ".tar.gz" if file.filename.lower().endswith((".tar.gz", ".tgz")) else os.path.splitext(file.filename)[1].lower()
+        else:
+            ext = os.path.splitext(file.filename)[1].lower()
+            if ext not in SUPPORTED_EXTENSIONS:
+                continue
 
-    FaissManager(user_email).add_document(
-        text,
-        {"doc_id": str(res.inserted_id), "filename": file.filename, "text_path": file_path}
-    )
+        # stream to disk instead of reading whole archives into memory
+        tmp_path = blobstore.temp_path(ext)
+        with open(tmp_path, "wb") as f:
+            await run_in_threadpool(shutil.copyfileobj, file.file, f, 1024 * 1024)
+
+        if is_archive(file.filename):
+            # unpacked by the worker; kept relative to UPLOAD_DIR like stored_path
+            archives.append(os.path.relpath(tmp_path, UPLOAD_DIR))
+        else:
+            owner = blobstore.new_owner()
+            entries.append({
+                "filename": file.filename,
+                "stored_path": await blobstore.store(db, tmp_path, ext, owner),
+                "owner": owner,
+            })
+
+    if not archives and not entries:
+        raise HTTPException(status_code=400, detail="No supported files in upload")
 
-    return {"message": "Uploaded", "doc_id": str(res.inserted_id)}
+    job_id = await jobs.enqueue(db, user_email, "bulk", filename=f"{len(files)} file(s)", archives=archives, entries=entries)
+
+    return {"message": "Queued", "job_id": job_id, "status_url": f"/api/jobs/{job_id}"}
 
 # ---------------------------------------------------------------
 # RAG ASK
@@ -264,12 +345,15 @@ async def ask_question(payload: dict, current_user=Depends(get_current_user)):
 
     user_email = current_user["email"]
 
-    hits = FaissManager(user_email).query(q, top_k=4)
-    context = "\n\n".join([h.get("text", "") for h in hits])
+    hits = await run_in_threadpool(lambda: get_index(user_email).query(q, top_k=config.RAG_TOP_K))
 
     if not openrouter:
         return {"answer": "AI not configured."}
 
+    # most relevant passages only, capped at CONTEXT_TOKEN_BUDGET
+    # (tokenizing and scoring passages is CPU work, keep it off the event loop)
+    context, _ = await run_in_threadpool(build_context, q, hits)
+
     prompt = f"""
 Use ONLY the context below to answer the question.
 
@@ -282,11 +366,13 @@ QUESTION:
 If not found, say: "I could not find the answer in the documents."
 """
 
-    response = openrouter.chat.completions.create(
-        model="mistralai/mixtral-8x7b-instruct",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=400
-    )
+    observe_prompt("ask", prompt)
+    with metrics.timer("llm"):
+        response = openrouter.chat.completions.create(
+            model="mistralai/mixtral-8x7b-instruct",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=400
+        )
 
     answer = _safe_extract(response)
     return {"answer": answer}
@@ -311,13 +397,27 @@ def _safe_extract(response: Any) -> str:
 # ---------------------------------------------------------------
 
 @router.get("/summaries")
-async def list_summaries(current_user=Depends(get_current_user)):
+async def list_summaries(
+    limit: int = config.PAGE_SIZE_DEFAULT,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user=Depends(get_current_user),
+):
 
     user_email = current_user["email"]
 
     db = get_mongo_client()[config.MONGO_DB_NAME]
 
-    rows = await db.summaries.find({"user": user_email}).sort("created_at", -1).to_list(300)
+    # list view only carries a preview; full text comes from /summaries/{sid}
+    page = await paginate(
+        db.summaries,
+        {"user": user_email},
+        projection={
+            "doc_id": 1, "filename": 1, "created_at": 1,
+            "preview": {"$substrCP": ["$text", 0, config.LIST_PREVIEW_CHARS]},
+        },
+        limit=limit, cursor=cursor, include_total=include_total,
+    )
 
     return {
         "summaries": [
@@ -325,11 +425,41 @@ async def list_summaries(current_user=Depends(get_current_user)):
                 "id": str(x["_id"]),
                 "docId": x.get("doc_id"),
                 "filename": x.get("filename"),
-                "text": x.get("text"),
+                "preview": x.get("preview"),
                 "createdAt": x.get("created_at").isoformat()
             }
-            for x in rows
-        ]
+            for x in page["rows"]
+        ],
+        "next_cursor": page["next_cursor"],
+        "total": page["total"],
+    }
+
+# ---------------------------------------------------------------
+# SUMMARY — DETAIL
+# ---------------------------------------------------------------
+
+@router.get("/summaries/{sid}")
+async def get_summary(sid: str, current_user=Depends(get_current_user)):
+
+    user_email = current_user["email"]
+
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+
+    try:
+        oid = ObjectId(sid)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid ID")
+
+    x = await db.summaries.find_one({"_id": oid, "user": user_email})
+    if not x:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return {
+        "id": str(x["_id"]),
+        "docId": x.get("doc_id"),
+        "filename": x.get("filename"),
+        "text": x.get("text"),
+        "createdAt": x.get("created_at").isoformat()
     }
 
 # ---------------------------------------------------------------
@@ -352,19 +482,17 @@ async def summarize_document(doc_id: str, current_user=Depends(get_current_user)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    path = os.path.join(UPLOAD_DIR, doc["stored_path"])
-    ext = os.path.splitext(path)[1].lower()
-
-    text = extract_text(path, ext).get("text", "")
+    text = (await blobstore.get_extraction(db, doc["stored_path"])).get("text", "")
 
     if not openrouter:
         summary = text[:600]
     else:
-        resp = openrouter.chat.completions.create(
-            model="mistralai/mixtral-8x7b-instruct",
-            messages=[{"role": "user", "content": f"Summarize concisely:\n{text}"}],
-            max_tokens=500,
-        )
+        with metrics.timer("llm"):
+            resp = openrouter.chat.completions.create(
+                model="mistralai/mixtral-8x7b-instruct",
+                messages=[{"role": "user", "content": f"Summarize concisely:\n{text}"}],
+                max_tokens=500,
+            )
         summary = _safe_extract(resp)
 
     # UPSERT (update if exists)
@@ -410,13 +538,27 @@ async def delete_summary(sid: str, current_user=Depends(get_current_user)):
 # ---------------------------------------------------------------
 
 @router.get("/quizzes")
-async def list_quizzes(current_user=Depends(get_current_user)):
+async def list_quizzes(
+    limit: int = config.PAGE_SIZE_DEFAULT,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user=Depends(get_current_user),
+):
 
     user_email = current_user["email"]
 
     db = get_mongo_client()[config.MONGO_DB_NAME]
 
-    rows = await db.quizzes.find({"user": user_email}).sort("created_at", -1).to_list(300)
+    # list view only carries a preview; full quiz comes from /quizzes/{qid}
+    page = await paginate(
+        db.quizzes,
+        {"user": user_email},
+        projection={
+            "doc_id": 1, "filename": 1, "num_questions": 1, "created_at": 1,
+            "preview": {"$substrCP": ["$questions", 0, config.LIST_PREVIEW_CHARS]},
+        },
+        limit=limit, cursor=cursor, include_total=include_total,
+    )
 
     return {
         "quizzes": [
@@ -424,12 +566,43 @@ async def list_quizzes(current_user=Depends(get_current_user)):
                 "id": str(x["_id"]),
                 "docId": x.get("doc_id"),
                 "filename": x.get("filename"),
-                "questions": x.get("questions"),
+                "preview": x.get("preview"),
                 "numQuestions": x.get("num_questions"),
                 "createdAt": x.get("created_at").isoformat()
             }
-            for x in rows
-        ]
+            for x in page["rows"]
+        ],
+        "next_cursor": page["next_cursor"],
+        "total": page["total"],
+    }
+
+# ---------------------------------------------------------------
+# QUIZ — DETAIL
+# ---------------------------------------------------------------
+
+@router.get("/quizzes/{qid}")
+async def get_quiz(qid: str, current_user=Depends(get_current_user)):
+
+    user_email = current_user["email"]
+
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+
+    try:
+        oid = ObjectId(qid)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid ID")
+
+    x = await db.quizzes.find_one({"_id": oid, "user": user_email})
+    if not x:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return {
+        "id": str(x["_id"]),
+        "docId": x.get("doc_id"),
+        "filename": x.get("filename"),
+        "questions": x.get("questions"),
+        "numQuestions": x.get("num_questions"),
+        "createdAt": x.get("created_at").isoformat()
     }
 
 # ---------------------------------------------------------------
@@ -452,19 +625,19 @@ async def generate_quiz(doc_id: str, payload: dict, current_user=Depends(get_cur
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    path = os.path.join(UPLOAD_DIR, doc["stored_path"])
-    content = extract_text(path, os.path.splitext(path)[1].lower()).get("text", "")
+    content = (await blobstore.get_extraction(db, doc["stored_path"])).get("text", "")
 
     num = int(payload.get("num_questions") or 10)
 
     if not openrouter:
         quiz = "AI disabled."
     else:
-        resp = openrouter.chat.completions.create(
-            model="mistralai/mixtral-8x7b-instruct",
-            messages=[{"role": "user", "content": f"Create {num} MCQs:\n{content}"}],
-            max_tokens=800,
-        )
+        with metrics.timer("llm"):
+            resp = openrouter.chat.completions.create(
+                model="mistralai/mixtral-8x7b-instruct",
+                messages=[{"role": "user", "content": f"Create {num} MCQs:\n{content}"}],
+                max_tokens=800,
+            )
         quiz = _safe_extract(resp)
 
     # UPSERT (update existing quiz for this document)
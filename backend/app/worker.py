@@ -0,0 +1,117 @@
+# app/worker.py
+"""
+Ingestion worker. Run one or more worker processes next to the API:
+
+    cd backend
+    python -m app.worker --concurrency 2
+
+With INGEST_INLINE_WORKER=1 (default) the API process also runs a worker
+task on startup, so a single-process deployment needs nothing extra.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from .deps import get_mongo_client
+from . import config, jobs
+from .ingest import ingest_upload, ingest_bulk, discard_expired
+
+log = logging.getLogger("idp.worker")
+
+# job kind -> pipeline coroutine(db, job, progress) -> result dict
+HANDLERS = {
+    "upload": ingest_upload,
+    "bulk": ingest_bulk,
+}
+
+
+async def _heartbeat(db, job, task):
+    """Renew the lease while the pipeline runs; cancel it if the job was reclaimed."""
+    interval = max(1.0, config.JOB_LEASE_SECONDS / 3)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            owned = await jobs.renew(db, job)
+        except Exception:
+            log.exception("could not renew lease for job %s", job["_id"])
+            continue
+        if not owned:
+            log.warning("lost lease on job %s, abandoning it", job["_id"])
+            task.cancel()
+            return
+
+
+async def run_job(db, job):
+    handler = HANDLERS.get(job.get("kind"))
+
+    async def progress(stage):
+        await jobs.set_stage(db, job, stage)
+
+    if handler is None:
+        await jobs.fail(db, job, ValueError(f"Unknown job kind: {job.get('kind')}"))
+        return
+
+    task = asyncio.create_task(handler(db, job, progress))
+    heartbeat = asyncio.create_task(_heartbeat(db, job, task))
+    try:
+        result = await task
+    except jobs.LeaseLost:
+        # another worker owns the job now; leave its state alone
+        log.warning("job %s reclaimed by another worker", job["_id"])
+    except asyncio.CancelledError:
+        if not heartbeat.done():
+            raise                       # worker shutdown, not a lost lease
+    except Exception as e:
+        log.exception("job %s failed (attempt %s)", job["_id"], job.get("attempts"))
+        await jobs.fail(db, job, e)
+    else:
+        await jobs.complete(db, job, result)
+    finally:
+        heartbeat.cancel()
+
+
+async def worker_loop(worker_id=None, stop: asyncio.Event | None = None):
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    db = get_mongo_client()[config.MONGO_DB_NAME]
+    next_sweep = 0.0
+
+    while not (stop and stop.is_set()):
+        try:
+            job = await jobs.claim(db, worker_id)
+        except Exception:
+            log.exception("could not claim job")
+            job = None
+
+        if job is None:
+            if time.monotonic() >= next_sweep:
+                next_sweep = time.monotonic() + config.JOB_SWEEP_SECONDS
+                try:
+                    await discard_expired(db)
+                except Exception:
+                    log.exception("could not discard expired jobs")
+            await asyncio.sleep(config.JOB_POLL_SECONDS)
+            continue
+
+        await run_job(db, job)
+
+
+def start_inline(concurrency=1):
+    """Start worker tasks inside the running event loop (API process)."""
+    return [asyncio.create_task(worker_loop()) for _ in range(concurrency)]
+
+
+async def _main(concurrency):
+    await asyncio.gather(*(worker_loop() for _ in range(concurrency)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IDP ingestion worker")
+    parser.add_argument("--concurrency", type=int, default=config.JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(_main(args.concurrency))
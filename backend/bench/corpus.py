@@ -0,0 +1,151 @@
+# bench/corpus.py
+"""
+Deterministic synthetic corpus: TXT, DOCX, PDF and PNG files with
+paragraph text drawn from a fixed vocabulary, plus identifiers
+(part numbers, names) that questions can target.
+"""
+import os
+import random
+
+WORDS = (
+    "the contract invoice payment policy employee handbook leave salary tax "
+    "audit report quarter revenue risk compliance vendor order shipment "
+    "warranty service level agreement termination clause renewal notice "
+    "customer support escalation process security access review budget "
+    "forecast approval manager department training onboarding equipment"
+).split()
+
+NAMES = ["Alice Moreau", "Bikram Shah", "Chen Wei", "Dana Okafor", "Elif Yilmaz", "Farid Haddad"]
+
+
+def paragraph(rnd, n_words):
+    words = rnd.choices(WORDS, k=n_words)
+    # sprinkle identifiers so lexical retrieval has something exact to find
+    for _ in range(max(1, n_words // 80)):
+        words.insert(rnd.randrange(len(words)), f"PN-{rnd.randint(1000, 9999)}")
+    sentences = []
+    for i in range(0, len(words), 14):
+        s = " ".join(words[i:i + 14])
+        sentences.append(s[:1].upper() + s[1:] + ".")
+    return " ".join(sentences)
+
+
+def document_text(rnd, n_words, doc_no):
+    paras = [f"Document {doc_no} prepared by {rnd.choice(NAMES)}."]
+    remaining = n_words
+    while remaining > 0:
+        n = min(remaining, rnd.randint(40, 160))
+        paras.append(paragraph(rnd, n))
+        remaining -= n
+    return "\n\n".join(paras)
+
+
+def mutate(text, rnd, rate=0.05):
+    """Copy of `text` with roughly `rate` of its sentences rewritten (for compare)."""
+    sentences = text.split(". ")
+    for i in rnd.sample(range(len(sentences)), max(1, int(len(sentences) * rate))):
+        sentences[i] = paragraph(rnd, 12).rstrip(".")
+    return ". ".join(sentences)
+
+
+# ---------------------------------------------------------------
+# WRITERS
+# ---------------------------------------------------------------
+
+def write_txt(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def write_docx(path, text):
+    import docx
+    d = docx.Document()
+    for p in text.split("\n\n"):
+        d.add_paragraph(p)
+    d.save(path)
+
+
+def _pdf_escape(s):
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, text, lines_per_page=50, chars_per_line=90):
+    """Plain single-font PDF written by hand (no PDF library needed)."""
+    lines = []
+    for p in text.split("\n\n"):
+        while p:
+            lines.append(p[:chars_per_line])
+            p = p[chars_per_line:]
+        lines.append("")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[""]]
+
+    objects = []            # 1-based PDF object bodies
+    n_pages = len(pages)
+    font_id = 3
+    first_page_id = 4
+
+    kids = " ".join(f"{first_page_id + 2 * i} 0 R" for i in range(n_pages))
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for i, page in enumerate(pages):
+        content_id = first_page_id + 2 * i + 1
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        ops = ["BT", "/F1 10 Tf", "14 TL", "40 760 Td"]
+        for line in page:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops)
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_png(path, text, width=1200):
+    """Render a short text as an image for the OCR path."""
+    from PIL import Image, ImageDraw
+
+    words = text.split()[:120]
+    lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    img = Image.new("RGB", (width, 40 + 28 * len(lines)), "white")
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((20, 20 + 28 * i), line, fill="black")
+    img.save(path)
+
+
+WRITERS = {".txt": write_txt, ".docx": write_docx, ".pdf": write_pdf, ".png": write_png}
+
+
+def generate(out_dir, n_docs=40, words=(200, 3000), kinds=(".txt", ".docx", ".pdf", ".png"), seed=0):
+    """
+    Write n_docs files to out_dir, cycling through `kinds`.
+    Returns [{"path", "ext", "words", "text"}].
+    """
+    rnd = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    files = []
+    for i in range(n_docs):
+        ext = kinds[i % len(kinds)]
+        n_words = rnd.randint(*words) if ext != ".png" else 100
+        text = document_text(rnd, n_words, i)
+        path = os.path.join(out_dir, f"doc_{i:04d}{ext}")
+        WRITERS[ext](path, text)
+        files.append({"path": path, "ext": ext, "words": n_words, "text": text})
+    return files
@@ -0,0 +1,92 @@
+# bench/embed_backends.py
+"""
+Compare embedding backends: throughput and drift against the reference
+sentence-transformers model.
+
+    cd backend
+    python -m bench.embed_backends --export ./onnx_model      # once
+    python -m bench.embed_backends --onnx-dir ./onnx_model --n 2000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from app import embeddings
+
+WORDS = (
+    "contract invoice payment policy employee handbook leave salary tax audit "
+    "report quarter revenue risk compliance vendor order shipment part number "
+    "warranty service level agreement termination clause renewal notice"
+).split()
+
+
+def synthetic_texts(n, seed=0):
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choices(WORDS, k=rnd.randint(8, 120))) for _ in range(n)]
+
+
+def throughput(provider, texts, batch_size):
+    provider.warmup()
+    start = time.perf_counter()
+    vecs = [provider.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+    elapsed = time.perf_counter() - start
+    return np.vstack(vecs), len(texts) / elapsed
+
+
+def drift(ref, other, k=10):
+    """Cosine similarity of paired vectors and top-k neighbour overlap."""
+    ref_n = ref / np.linalg.norm(ref, axis=1, keepdims=True)
+    oth_n = other / np.linalg.norm(other, axis=1, keepdims=True)
+    cos = (ref_n * oth_n).sum(axis=1)
+
+    q = min(100, len(ref))
+    top_ref = np.argsort(-(ref_n[:q] @ ref_n.T), axis=1)[:, 1:k + 1]
+    top_oth = np.argsort(-(oth_n[:q] @ oth_n.T), axis=1)[:, 1:k + 1]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(top_ref, top_oth)])
+
+    return {
+        "cosine_mean": float(cos.mean()),
+        "cosine_min": float(cos.min()),
+        f"top{k}_overlap": float(overlap),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", help="export ONNX (+int8) model to this directory and exit")
+    parser.add_argument("--onnx-dir", help="directory produced by --export")
+    parser.add_argument("--n", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.export:
+        embeddings.export_onnx(args.export)
+        print(f"exported to {args.export}")
+        return
+
+    texts = synthetic_texts(args.n)
+    results = {"n_texts": args.n, "batch_size": args.batch_size, "backends": {}}
+
+    ref_vecs, ref_tps = throughput(embeddings.SentenceTransformerProvider(), texts, args.batch_size)
+    results["backends"]["sentence-transformers"] = {"texts_per_sec": ref_tps}
+
+    if args.onnx_dir:
+        onnx_vecs, onnx_tps = throughput(embeddings.OnnxProvider(args.onnx_dir), texts, args.batch_size)
+        results["backends"]["onnx"] = {
+            "texts_per_sec": onnx_tps,
+            "speedup": onnx_tps / ref_tps,
+            **drift(ref_vecs, onnx_vecs),
+        }
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# bench/fake_llm.py
+"""
+OpenAI-compatible /chat/completions stub with a configurable latency,
+so benchmarks exercise the real client code without network or quota.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+
+        time.sleep(self.delay)
+
+        payload = {
+            "id": "bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Benchmark answer."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": 3, "total_tokens": prompt_chars // 4 + 3},
+        }
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(delay_ms=50, port=0):
+    """Start the server in a daemon thread. Returns (server, base_url)."""
+    handler = type("Handler", (_Handler,), {"delay": delay_ms / 1000.0})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
@@ -0,0 +1,328 @@
+# bench/run.py
+"""
+Offline benchmark / load test for the backend.
+
+Runs the real FastAPI app in-process (httpx ASGI transport) against a
+Mongo stand-in (mongomock-motor, or a real server via --mongo-uri) and a
+fake OpenAI-compatible LLM, on a generated corpus, and measures:
+
+  ingest    upload throughput (files/s) until every ingest job is done
+  ask       /api/ask latency p50/p99 under concurrency
+  compare   /api/documents/compare latency vs document size
+  chat      chat messages/s with many concurrent users
+
+    cd backend
+    pip install -r bench/requirements.txt
+    python -m bench.run --out bench/results/current.json
+    python -m bench.run --baseline bench/results/v1.json     # flag regressions
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+# ---------------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------------
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def latency_summary(samples):
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+    }
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    res = await coro
+    return time.perf_counter() - start, res
+
+
+def setup_environment(args, workdir):
+    """Point the app at temp dirs, the fake LLM and the Mongo stand-in before it is imported."""
+    from bench import fake_llm
+
+    os.chdir(workdir)           # vectorstores/ and uploads/ are created under cwd
+    server, base_url = fake_llm.start(delay_ms=args.llm_delay_ms)
+
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+    os.environ["MONGO_DB_NAME"] = "idp_bench"
+    os.environ["INGEST_INLINE_WORKER"] = "1"
+    # measure the pipeline, not the per-user rate limits
+    os.environ.setdefault("ADMISSION_ENABLED", "0")
+    if args.mongo_uri:
+        os.environ["MONGODB_URI"] = args.mongo_uri
+
+    from app import deps
+    if not args.mongo_uri:
+        from mongomock_motor import AsyncMongoMockClient
+        deps._client = AsyncMongoMockClient()
+
+    return server
+
+
+async def register(client, n_users):
+    tokens = []
+    for i in range(n_users):
+        email = f"bench{i}@example.com"
+        await client.post("/auth/signup", json={"name": f"Bench {i}", "email": email, "password": "pw"})
+        res = await client.post("/auth/login_json", json={"email": email, "password": "pw"})
+        tokens.append({"Authorization": f"Bearer {res.json()['access_token']}"})
+    return tokens
+
+
+async def wait_jobs(client, headers, job_ids, timeout=600):
+    deadline = time.monotonic() + timeout
+    pending = set(job_ids)
+    results = {}
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            job = (await client.get(f"/api/jobs/{job_id}", headers=headers)).json()
+            if job["status"] in ("done", "failed"):
+                pending.discard(job_id)
+                results[job_id] = job
+        if pending:
+            await asyncio.sleep(0.05)
+    return results
+
+
+# ---------------------------------------------------------------
+# SCENARIOS
+# ---------------------------------------------------------------
+
+async def bench_ingest(client, headers, files):
+    start = time.perf_counter()
+    job_ids = []
+    for f in files:
+        with open(f["path"], "rb") as fh:
+            res = await client.post("/api/upload", headers=headers, files={"file": (os.path.basename(f["path"]), fh.read())})
+        job_ids.append(res.json()["job_id"])
+    jobs = await wait_jobs(client, headers, job_ids)
+    elapsed = time.perf_counter() - start
+
+    failed = [j for j in jobs.values() if j["status"] != "done"]
+    return {
+        "files": len(files),
+        "seconds": round(elapsed, 3),
+        "files_per_sec": round(len(files) / elapsed, 3),
+        "failed": len(failed) + len(job_ids) - len(jobs),
+        "by_type": {ext: sum(1 for f in files if f["ext"] == ext) for ext in sorted({f["ext"] for f in files})},
+    }
+
+
+async def bench_ask(client, headers, files, n_requests, concurrency, rnd):
+    questions = []
+    for f in files:
+        words = f["text"].split()
+        ids = [w.rstrip(".") for w in words if w.startswith("PN-")]
+        questions.append(f"What does the document say about {rnd.choice(ids) if ids else words[5]}?")
+
+    sem = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(q):
+        async with sem:
+            dt, res = await timed(client.post("/api/ask", headers=headers, json={"question": q}))
+            if res.status_code == 200:
+                samples.append(dt)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(rnd.choice(questions)) for _ in range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    return {"concurrency": concurrency, "req_per_sec": round(n_requests / elapsed, 2), **latency_summary(samples)}
+
+
+async def bench_compare(client, headers, workdir, sizes, rnd):
+    from bench import corpus
+
+    out = []
+    for n_words in sizes:
+        text = corpus.document_text(rnd, n_words, n_words)
+        paths = []
+        for suffix, body in (("a", text), ("b", corpus.mutate(text, rnd))):
+            path = os.path.join(workdir, f"compare_{n_words}_{suffix}.txt")
+            corpus.write_txt(path, body)
+            paths.append(path)
+
+        job_ids = []
+        for p in paths:
+            with open(p, "rb") as fh:
+                res = await client.post("/api/upload", headers=headers, files={"file": (os.path.basename(p), fh.read())})
+            job_ids.append(res.json()["job_id"])
+        jobs = await wait_jobs(client, headers, job_ids)
+        doc_ids = [jobs[j]["result"]["doc_id"] for j in job_ids]
+
+        payload = {"doc_id_a": doc_ids[0], "doc_id_b": doc_ids[1]}
+        cold, res = await timed(client.post("/api/documents/compare", headers=headers, json=payload))
+        warm, _ = await timed(client.post("/api/documents/compare", headers=headers, json=payload))
+        out.append({
+            "words": n_words,
+            "cold_ms": round(cold * 1000, 2),
+            "cached_ms": round(warm * 1000, 2),
+            "similarity": res.json().get("similarity"),
+        })
+    return out
+
+
+async def bench_chat(client, tokens, messages_per_user):
+    samples = []
+
+    async def user(headers):
+        res = await client.post("/api/chat/start", headers=headers, json={"message": "Hello, summarise my leave policy."})
+        chat_id = res.json()["chat"]["_id"]
+        for i in range(messages_per_user):
+            dt, _ = await timed(client.post(f"/api/chat/{chat_id}/message", headers=headers, json={"message": f"Follow-up question {i}"}))
+            samples.append(dt)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(h) for h in tokens))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "users": len(tokens),
+        "messages": len(samples),
+        "messages_per_sec": round(len(samples) / elapsed, 2),
+        **latency_summary(samples),
+    }
+
+
+# ---------------------------------------------------------------
+# REGRESSION CHECK
+# ---------------------------------------------------------------
+
+# (path in results, True if higher is better)
+TRACKED = [
+    (("ingest", "files_per_sec"), True),
+    (("ask", "p50_ms"), False),
+    (("ask", "p99_ms"), False),
+    (("chat", "messages_per_sec"), True),
+    (("chat", "p99_ms"), False),
+]
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    for path, higher_better in TRACKED:
+        cur, base = results, baseline
+        for key in path:
+            cur = (cur or {}).get(key)
+            base = (base or {}).get(key)
+        if not cur or not base:
+            continue
+        change = (cur - base) / base
+        if (higher_better and change < -tolerance) or (not higher_better and change > tolerance):
+            regressions.append({"metric": ".".join(path), "baseline": base, "current": cur, "change": round(change, 3)})
+    return regressions
+
+
+# ---------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------
+
+async def run(args):
+    import httpx
+    from bench import corpus
+
+    workdir = tempfile.mkdtemp(prefix="idp_bench_")
+    setup_environment(args, workdir)
+
+    from app.main import app
+
+    rnd = random.Random(args.seed)
+    files = corpus.generate(os.path.join(workdir, "corpus"), n_docs=args.docs, seed=args.seed,
+                            kinds=tuple(args.kinds.split(",")))
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        }
+    }
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            tokens = await register(client, max(1, args.chat_users))
+            headers = tokens[0]
+
+            results["ingest"] = await bench_ingest(client, headers, files)
+            results["ask"] = await bench_ask(client, headers, files, args.ask_requests, args.concurrency, rnd)
+            results["compare"] = await bench_compare(client, headers, workdir, [int(s) for s in args.compare_sizes.split(",")], rnd)
+            results["chat"] = await bench_chat(client, tokens, args.chat_messages)
+
+            results["metrics"] = (await client.get("/metrics")).text
+    finally:
+        await app.router.shutdown()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--kinds", default=".txt,.docx,.pdf,.png")
+    parser.add_argument("--ask-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--compare-sizes", default="1000,10000,50000")
+    parser.add_argument("--chat-users", type=int, default=20)
+    parser.add_argument("--chat-messages", type=int, default=5)
+    parser.add_argument("--llm-delay-ms", type=int, default=50)
+    parser.add_argument("--mongo-uri", help="use a real MongoDB instead of mongomock-motor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative change before flagging")
+    args = parser.parse_args()
+
+    # the run changes directory, so resolve output paths first
+    args.out = args.out and os.path.abspath(args.out)
+    args.baseline = args.baseline and os.path.abspath(args.baseline)
+
+    results = asyncio.run(run(args))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["regressions"] = compare_to_baseline(results, json.load(f), args.tolerance)
+
+    summary = {k: v for k, v in results.items() if k != "metrics"}
+    print(json.dumps(summary, indent=2, default=str))
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+    if results.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
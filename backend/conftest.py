@@ -0,0 +1 @@
+# Makes `app` importable when pytest is run from backend/.
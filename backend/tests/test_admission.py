@@ -0,0 +1,142 @@
+# Token buckets and the bounded concurrency queue.
+import asyncio
+
+import pytest
+
+from app import admission, config
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_burst_then_reports_wait(clock):
+    bucket = admission.TokenBucket(rate=0.5, burst=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(2.0)
+
+    clock[0] += 1.0
+    assert bucket.take() == pytest.approx(1.0)
+    clock[0] += 1.0
+    assert bucket.take() == 0
+
+
+def test_bucket_refill_is_capped_at_burst(clock):
+    bucket = admission.TokenBucket(rate=1, burst=3)
+    bucket.take()
+    clock[0] += 100
+    assert bucket.full(clock[0])
+    assert bucket.tokens == 3
+
+
+def test_policy_for_routes():
+    assert admission.policy_for("POST", "/api/upload/bulk").name == "upload"
+    assert admission.policy_for("POST", "/api/chat/start").name == "llm"
+    assert admission.policy_for("GET", "/api/ask") is None
+    assert admission.policy_for("GET", "/api/documents") is None
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_limiter_times_out_when_full():
+    async def scenario():
+        limiter = admission.Limiter(1)
+        assert await limiter.acquire(1)
+        assert not await limiter.acquire(0.01)
+        assert limiter.active == 1
+        assert not limiter.waiters
+
+    run(scenario())
+
+
+def test_limiter_rejects_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(config, "ADMIT_MAX_QUEUE", 1)
+
+    async def scenario():
+        limiter = admission.Limiter(1)
+        assert await limiter.acquire(1)
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await settle()
+        assert not await limiter.acquire(1)
+        limiter.release()
+        assert await waiter
+        assert limiter.active == 1
+
+    run(scenario())
+
+
+def test_release_hands_slot_to_oldest_waiter():
+    async def scenario():
+        limiter = admission.Limiter(1)
+        order = []
+        assert await limiter.acquire(1)
+
+        async def wait(name):
+            assert await limiter.acquire(1)
+            order.append(name)
+
+        tasks = [asyncio.create_task(wait("a")), asyncio.create_task(wait("b"))]
+        await settle()
+        limiter.release()
+        await settle()
+        assert order == ["a"]
+        assert limiter.active == 1          # handed over, not freed
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b"]
+        limiter.release()
+        assert limiter.active == 0
+
+    run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        limiter = admission.Limiter(1)
+        assert await limiter.acquire(1)
+        waiter = asyncio.create_task(limiter.acquire(5))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not limiter.waiters
+
+        limiter.release()
+        assert limiter.active == 0
+        assert await limiter.acquire(0.01)
+
+    run(scenario())
+
+
+def test_slot_handed_over_to_cancelled_waiter_is_released():
+    async def scenario():
+        limiter = admission.Limiter(1)
+        assert await limiter.acquire(1)
+        waiter = asyncio.create_task(limiter.acquire(5))
+        await settle()
+        limiter.release()                   # slot handed to the waiter...
+        waiter.cancel()                     # ...which goes away before running
+        try:
+            held = await waiter
+        except asyncio.CancelledError:
+            held = False
+        # depending on the Python version wait_for may still return the slot;
+        # either the waiter owns it or it was given back
+        if held:
+            assert limiter.active == 1
+            limiter.release()
+        assert limiter.active == 0
+        assert not limiter.waiters
+
+    run(scenario())
@@ -0,0 +1,53 @@
+# Token-budgeted context assembly.
+from app import config
+from app.context import build_context, count_tokens, split_passages, truncate_tokens
+
+
+def test_count_and_truncate_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens("x" * (config.CONTEXT_CHARS_PER_TOKEN * 3 + 1)) == 4
+
+    text = " ".join(["word"] * 200)
+    cut = truncate_tokens(text, 10)
+    assert cut.endswith(" …")
+    assert len(cut.removesuffix(" …")) <= 10 * config.CONTEXT_CHARS_PER_TOKEN
+    assert not cut.removesuffix(" …").endswith(" ")
+    assert truncate_tokens("short", 10) == "short"
+
+
+def test_split_passages_respects_size():
+    text = "\n\n".join(" ".join(f"p{p}w{i}." for i in range(80)) for p in range(3))
+    passages = split_passages(text, max_tokens=50)
+    assert len(passages) > 3
+    assert all(count_tokens(p) <= 50 for p in passages)
+
+
+def test_context_stays_within_budget():
+    hits = [{"filename": f"doc{i}.txt", "text": " ".join(f"d{i}w{j}" for j in range(2000))} for i in range(5)]
+    context, stats = build_context("d0w1 d3w7", hits, budget=300)
+    assert stats["tokens"] <= 300
+    assert count_tokens(context) <= 300 + 10     # block separators are not budgeted
+    assert stats["passages"] < stats["candidates"]
+
+
+def test_near_duplicates_are_dropped():
+    shared = "The quarterly revenue grew by twelve percent driven by subscription sales in Europe."
+    hits = [
+        {"filename": "a.txt", "text": shared},
+        {"filename": "b.txt", "text": shared},
+        {"filename": "c.txt", "text": "Headcount stayed flat across all regions this quarter."},
+    ]
+    context, stats = build_context("revenue growth", hits, budget=1000)
+    assert stats["duplicates"] == 1
+    assert context.count("twelve percent") == 1
+    assert "[b.txt]" not in context
+
+
+def test_passages_keep_retrieval_and_reading_order():
+    hits = [
+        {"filename": "first.txt", "text": "alpha one.\n\nalpha two."},
+        {"filename": "second.txt", "text": "beta one."},
+    ]
+    context, _ = build_context("beta", hits, budget=1000)
+    assert context.index("[first.txt]") < context.index("alpha one") < context.index("alpha two")
+    assert context.index("alpha two") < context.index("[second.txt]") < context.index("beta one")
@@ -0,0 +1,71 @@
+# Anchored two-level diff and the similarity estimate.
+from app import config, diff
+
+
+def _words(n, prefix="w"):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_identical_texts():
+    text = "First sentence here. Second one follows.\nNew paragraph."
+    similarity, chunks, approximate = diff.compute_diff_chunks(text, text)
+    assert similarity == 100.0
+    assert [c["op"] for c in chunks] == ["equal"]
+    assert not approximate
+
+
+def test_empty_texts():
+    assert diff.compute_diff_chunks("", "") == (100.0, [], False)
+    assert diff.estimate_similarity("", "") == 100.0
+
+
+def test_changed_sentence_is_diffed_word_by_word():
+    a = "The cat sat on the mat. It was warm."
+    b = "The dog sat on the mat. It was warm."
+    similarity, chunks, approximate = diff.compute_diff_chunks(a, b)
+    assert not approximate
+    assert {"op": "replace", "a": "cat", "b": "dog"} in chunks
+    # 8 of 9 words match on each side
+    assert round(similarity, 2) == round(200.0 * 8 / 18, 2)
+
+
+def test_appended_paragraph_is_an_insert():
+    a = "Keep this. Keep that."
+    b = "Keep this. Keep that.\nBrand new paragraph."
+    similarity, chunks, _ = diff.compute_diff_chunks(a, b)
+    assert chunks == [
+        {"op": "equal", "a": "Keep this. Keep that.", "b": "Keep this. Keep that."},
+        {"op": "insert", "a": None, "b": "Brand new paragraph."},
+    ]
+    assert round(similarity, 2) == round(200.0 * 4 / 11, 2)
+
+
+def test_oversized_block_falls_back_to_estimate(monkeypatch):
+    # one unpunctuated 2500-word block with a single word changed
+    a = _words(2500)
+    b = a.replace("w1000 ", "changed ", 1)
+    monkeypatch.setattr(config, "DIFF_BLOCK_LIMIT", 1000)
+
+    similarity, chunks, approximate = diff.compute_diff_chunks(a, b)
+    assert approximate
+    assert [c["op"] for c in chunks] == ["replace"]
+    assert similarity > 99.0
+
+
+def test_estimate_is_an_upper_bound():
+    a = "a b c d"
+    b = "d c b a"
+    exact, _, _ = diff.compute_diff_chunks(a, b)
+    assert diff.estimate_similarity(a, b) == 100.0
+    assert exact < 100.0
+
+
+def test_pair_cache_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(config, "DIFF_CACHE_SIZE", 2)
+    monkeypatch.setattr(diff, "_cache", type(diff._cache)())
+    diff.cache_put("a", 1)
+    diff.cache_put("b", 2)
+    assert diff.cache_get("a") == 1          # refreshes "a"
+    diff.cache_put("c", 3)
+    assert diff.cache_get("b") is None
+    assert diff.cache_get("a") == 1 and diff.cache_get("c") == 3
@@ -0,0 +1,210 @@
+# Job queue lifecycle: failure, retry without re-upload, and discarding.
+import asyncio
+import copy
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+from bson import ObjectId
+
+from app import config, ingest, jobs, worker
+
+USER = "alice@example.com"
+
+
+# ---------------------------------------------------------------
+# IN-MEMORY COLLECTION (the subset of motor the queue uses)
+# ---------------------------------------------------------------
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _apply(doc, update):
+    for key, value in update.get("$set", {}).items():
+        doc[key] = value
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def find_one(self, query, projection=None):
+        return next((copy.deepcopy(d) for d in self.docs if _matches(d, query)), None)
+
+    def find(self, query, projection=None):
+        return _Cursor([copy.deepcopy(d) for d in self.docs if _matches(d, query)])
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=False):
+        matching = [d for d in self.docs if _matches(d, query)]
+        for field, direction in reversed(sort or []):
+            matching.sort(key=lambda d: d[field], reverse=direction < 0)
+        if not matching:
+            return None
+        before = copy.deepcopy(matching[0])
+        _apply(matching[0], update)
+        return copy.deepcopy(matching[0]) if return_document else before
+
+    async def update_one(self, query, update):
+        doc = next((d for d in self.docs if _matches(d, query)), None)
+        if doc is not None:
+            _apply(doc, update)
+        return SimpleNamespace(matched_count=int(doc is not None))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = SimpleNamespace(ingest_jobs=FakeCollection(), documents=FakeCollection())
+    monkeypatch.setattr(jobs, "get_mongo_client", lambda: {config.MONGO_DB_NAME: db})
+    monkeypatch.setattr(config, "JOB_MAX_ATTEMPTS", 1)
+    return db
+
+
+@pytest.fixture
+def released(monkeypatch):
+    calls = []
+
+    async def release(db, stored_path, owner=None):
+        calls.append((stored_path, owner))
+
+    monkeypatch.setattr(ingest.blobstore, "release", release)
+    return calls
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _enqueue(db):
+    return await jobs.enqueue(db, USER, "upload", filename="a.pdf",
+                              stored_path="blobs/ab/abc.pdf", blob_owner="upload:1")
+
+
+async def _status(db, job_id):
+    return (await db.ingest_jobs.find_one({"_id": ObjectId(job_id)}))["status"]
+
+
+def test_failed_job_keeps_its_files_and_retries_to_done(db, released, monkeypatch):
+    outcomes = [RuntimeError("ocr crashed"), {"doc_id": "d1", "duplicate": False}]
+
+    async def handler(db, job, progress):
+        await progress("extracting")
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setitem(worker.HANDLERS, "upload", handler)
+
+    async def scenario():
+        job_id = await _enqueue(db)
+
+        await worker.run_job(db, await jobs.claim(db, "w1"))
+        assert await _status(db, job_id) == "failed"
+        assert released == []                      # files stay for the retry
+
+        view = await jobs.retry_job(job_id, current_user={"email": USER})
+        assert view["status"] == "queued" and view["attempts"] == 0
+
+        await worker.run_job(db, await jobs.claim(db, "w2"))
+        job = await db.ingest_jobs.find_one({"_id": ObjectId(job_id)})
+        assert job["status"] == "done"
+        assert job["result"] == {"doc_id": "d1", "duplicate": False}
+        assert released == []
+
+    _run(scenario())
+
+
+def test_reclaimed_job_is_not_completed_by_the_old_worker(db, released):
+    async def scenario():
+        job_id = await _enqueue(db)
+        stale = await jobs.claim(db, "w1")
+
+        # lease expired, another worker took over
+        await db.ingest_jobs.update_one({"_id": stale["_id"]}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+        current = await jobs.claim(db, "w2")
+        assert current["worker"] == "w2"
+
+        with pytest.raises(jobs.LeaseLost):
+            await jobs.set_stage(db, stale, "extracting")
+        assert not await jobs.complete(db, stale, {"doc_id": "x"})
+        assert await jobs.complete(db, current, {"doc_id": "y"})
+        assert (await db.ingest_jobs.find_one({"_id": ObjectId(job_id)}))["result"] == {"doc_id": "y"}
+
+    _run(scenario())
+
+
+def test_discard_releases_files_once_and_blocks_retry(db, released):
+    async def scenario():
+        job_id = await _enqueue(db)
+        await db.ingest_jobs.update_one({"_id": ObjectId(job_id)}, {"$set": {"status": "failed"}})
+
+        # not expired yet
+        assert await ingest.discard_expired(db) == 0
+
+        assert (await jobs.discard_job(job_id, current_user={"email": USER}))["message"] == "Discarded"
+        assert released == [("blobs/ab/abc.pdf", "upload:1")]
+        assert await _status(db, job_id) == "discarded"
+
+        with pytest.raises(jobs.HTTPException) as exc:
+            await jobs.retry_job(job_id, current_user={"email": USER})
+        assert exc.value.status_code == 409
+        with pytest.raises(jobs.HTTPException):
+            await jobs.discard_job(job_id, current_user={"email": USER})
+        assert len(released) == 1
+
+    _run(scenario())
+
+
+def test_expired_failed_jobs_are_discarded(db, released):
+    async def scenario():
+        job_id = await _enqueue(db)
+        old = datetime.utcnow() - timedelta(hours=config.JOB_FAILED_RETENTION_HOURS + 1)
+        await db.ingest_jobs.update_one({"_id": ObjectId(job_id)}, {"$set": {"status": "failed", "updated_at": old}})
+
+        assert await ingest.discard_expired(db) == 1
+        assert await _status(db, job_id) == "discarded"
+        assert released == [("blobs/ab/abc.pdf", "upload:1")]
+
+    _run(scenario())
@@ -0,0 +1,63 @@
+# BM25 scoring and reciprocal rank fusion.
+from app.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _index(*texts):
+    idx = BM25Index()
+    for i, text in enumerate(texts):
+        idx.add(i, text)
+    return idx
+
+
+def test_tokenize_keeps_identifiers():
+    assert tokenize("See AB-1234 in v2.1, user_id!") == ["see", "ab-1234", "in", "v2.1", "user_id"]
+
+
+def test_empty_index_returns_nothing():
+    assert BM25Index().search("anything") == []
+
+
+def test_exact_identifier_ranks_first():
+    idx = _index(
+        "general notes about the invoice process",
+        "ticket AB-1234 was closed after the invoice fix",
+        "ticket AB-9999 is still open",
+    )
+    hits = idx.search("AB-1234")
+    assert [doc_id for doc_id, _ in hits] == [1]
+
+
+def test_rare_terms_outweigh_common_ones():
+    idx = _index("alpha common", "beta common", "gamma common")
+    hits = idx.search("common beta")
+    assert hits[0][0] == 1
+    assert hits[0][1] > hits[1][1]
+
+
+def test_shorter_document_wins_on_equal_tf():
+    idx = _index("budget " + "filler " * 50, "budget report", "unrelated words")
+    assert idx.search("budget")[0][0] == 1
+
+
+def test_round_trip(tmp_path):
+    idx = _index("first document", "second document")
+    path = tmp_path / "bm25.json"
+    idx.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 2
+    assert loaded.search("second") == idx.search("second")
+    assert BM25Index.load(tmp_path / "missing.json") is None
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([1, 2, 3], [3, 1, 4], k=60)
+    ids = [doc_id for doc_id, _ in fused]
+    assert ids[0] == 1                      # ranks 1 and 2
+    assert ids.index(3) < ids.index(2)      # in both lists beats top-2 of one
+    assert set(ids) == {1, 2, 3, 4}
+    assert dict(fused)[4] == 1.0 / 63
+
+
+def test_rrf_without_rankings():
+    assert reciprocal_rank_fusion() == []
+    assert reciprocal_rank_fusion([]) == []
@@ -0,0 +1,32 @@
+# Route labels of the request metrics.
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from app import admission, config, main, metrics
+
+
+def _count(method, route, status):
+    return metrics.HTTP_REQUESTS._values.get((method, route, status), 0)
+
+
+def test_route_template_includes_router_prefix():
+    assert main.route_template("GET", "/api/jobs/abc") == "/api/jobs/{job_id}"
+    assert main.route_template("POST", "/api/upload") == "/api/upload"
+    assert main.route_template("GET", "/metrics") == "/metrics"
+    assert main.route_template("GET", "/no/such/thing") is None
+
+
+def test_admission_rejections_are_labelled_with_their_route(monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission.POLICIES["llm"], "rate", 0)
+    monkeypatch.setattr(admission.POLICIES["llm"], "burst", 0)
+    monkeypatch.setattr(admission, "_buckets", {})
+
+    before = _count("POST", "/api/ask", 429)
+    res = TestClient(main.app).post("/api/ask", json={"question": "hi"})
+    assert res.status_code == 429
+    assert _count("POST", "/api/ask", 429) == before + 1
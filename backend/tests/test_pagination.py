@@ -0,0 +1,95 @@
+# Keyset cursors and the page queries built from them.
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app import config
+from app.pagination import clamp_limit, decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip_datetime_and_plain_values():
+    oid = ObjectId()
+    when = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    assert decode_cursor(encode_cursor(when, oid)) == (when, oid)
+    assert decode_cursor(encode_cursor(None, oid)) == (None, oid)
+    assert decode_cursor(encode_cursor(42, oid)) == (42, oid)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(datetime.utcnow(), ObjectId())
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("bad", ["", "not-a-cursor", encode_cursor(1, ObjectId())[:-4]])
+def test_invalid_cursor_is_a_400(bad):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(bad)
+    assert exc.value.status_code == 400
+
+
+def test_clamp_limit():
+    assert clamp_limit(None) == config.PAGE_SIZE_DEFAULT
+    assert clamp_limit(0) == config.PAGE_SIZE_DEFAULT
+    assert clamp_limit(5) == 5
+    assert clamp_limit(10 ** 6) == config.PAGE_SIZE_MAX
+
+
+class _Recorder:
+    """Collection stub that records the query and serves rows newest-first."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.query = self.sorted_by = None
+
+    def find(self, query, projection=None):
+        self.query = query
+        return self
+
+    def sort(self, sort):
+        self.sorted_by = sort
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    async def to_list(self, n):
+        return self.rows[:n]
+
+    async def count_documents(self, query):
+        return len(self.rows)
+
+
+def test_paginate_on_a_field_breaks_ties_on_id():
+    oids = sorted(ObjectId() for _ in range(3))[::-1]
+    when = datetime(2024, 1, 1)
+    rows = [{"_id": oid, "updated_at": when} for oid in oids]
+    coll = _Recorder(rows)
+
+    page = asyncio.run(paginate(coll, {"user": "u"}, sort_field="updated_at", limit=2, include_total=True))
+    assert coll.sorted_by == [("updated_at", -1), ("_id", -1)]
+    assert [r["_id"] for r in page["rows"]] == oids[:2]
+    assert page["total"] == 3
+    assert decode_cursor(page["next_cursor"]) == (when, oids[1])
+
+    asyncio.run(paginate(coll, {"user": "u"}, sort_field="updated_at", limit=2, cursor=page["next_cursor"]))
+    assert coll.query == {"$and": [{"user": "u"}, {"$or": [
+        {"updated_at": {"$lt": when}},
+        {"updated_at": when, "_id": {"$lt": oids[1]}},
+    ]}]}
+
+
+def test_paginate_on_id_and_last_page():
+    oid = ObjectId()
+    coll = _Recorder([{"_id": oid}])
+    cursor = encode_cursor(None, ObjectId())
+    page = asyncio.run(paginate(coll, {"user": "u"}, limit=5, cursor=cursor))
+    assert coll.sorted_by == [("_id", -1)]
+    assert coll.query["_id"] == {"$lt": decode_cursor(cursor)[1]}
+    assert page["next_cursor"] is None and page["total"] is None
@@ -8,6 +8,7 @@ import AILoader from "../components/AILoader";
 export default function Changes() {
   const [docs, setDocs] = useState([]);
   const [loadingDocs, setLoadingDocs] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const [docA, setDocA] = useState("");
   const [docB, setDocB] = useState("");
@@ -26,17 +27,22 @@ export default function Changes() {
     loadDocs(token);
   }, []);
 
-  const loadDocs = async (token) => {
+  const loadDocs = async (token, cursor = null) => {
     try {
       const res = await axios.get("http://localhost:8000/api/documents", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: cursor || undefined },
       });
+
       const list = res.data.documents || [];
-      setDocs(list);
+      setDocs((prev) => (cursor ? [...prev, ...list] : list));
+      setNextCursor(res.data.next_cursor || null);
 
       // pre-select first two if available
-      if (list.length >= 1) setDocA(list[0]._id);
-      if (list.length >= 2) setDocB(list[1]._id);
+      if (!cursor) {
+        if (list.length >= 1) setDocA(list[0]._id);
+        if (list.length >= 2) setDocB(list[1]._id);
+      }
     } catch (e) {
       if (e.response?.status === 401) {
         localStorage.removeItem("token");
@@ -206,6 +212,15 @@ export default function Changes() {
             )}
           </button>
 
+          {!loadingDocs && nextCursor && (
+            <button
+              onClick={() => loadDocs(localStorage.getItem("token"), nextCursor)}
+              className="px-4 py-2 rounded-lg border border-black/10 dark:border-white/20 text-sm text-black dark:text-white"
+            >
+              Load more documents
+            </button>
+          )}
+
           {!loadingDocs && docs.length === 0 && (
             <span className="text-sm text-black/60 dark:text-white/60">
               No documents uploaded yet. Go to <strong>Upload</strong> first.
@@ -7,6 +7,7 @@ import { setAuthHeader } from "../api";
 
 export default function ChatsPage() {
   const [chats, setChats] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     const token = localStorage.getItem("token");
@@ -19,12 +20,21 @@ export default function ChatsPage() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
-  const fetchChats = async (token) => {
+  const fetchChats = async (token, cursor = null) => {
     try {
       const res = await axios.get("http://localhost:8000/api/chat/list", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: cursor || undefined },
       });
-      setChats(res.data.chats || []);
+
+      const list = res.data.chats || [];
+      // a chat that got a new message while paging can come back on a later page
+      setChats((prev) => {
+        if (!cursor) return list;
+        const seen = new Set(prev.map((c) => c.chat_id));
+        return [...prev, ...list.filter((c) => !seen.has(c.chat_id))];
+      });
+      setNextCursor(res.data.next_cursor || null);
     } catch (e) {
       console.error("fetch chats failed", e);
     }
@@ -49,6 +59,17 @@ export default function ChatsPage() {
               </Link>
             ))}
           </div>
+
+          {nextCursor && (
+            <div className="mt-4 flex justify-center">
+              <button
+                onClick={() => fetchChats(localStorage.getItem("token"), nextCursor)}
+                className="px-4 py-2 rounded border text-sm"
+              >
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
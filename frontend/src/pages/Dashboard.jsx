@@ -10,6 +10,7 @@ import { ThemeContext } from "../context/ThemeContext";
 export default function Dashboard() {
   const [docs, setDocs] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const [summarizingId, setSummarizingId] = useState(null);
   const [quizId, setQuizId] = useState(null);
@@ -25,12 +26,16 @@ export default function Dashboard() {
     loadDocs(token);
   }, []);
 
-  const loadDocs = async (token) => {
+  const loadDocs = async (token, cursor = null) => {
     try {
       const res = await axios.get("http://localhost:8000/api/documents", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: cursor || undefined },
       });
-      setDocs(res.data.documents || []);
+
+      const list = res.data.documents || [];
+      setDocs((prev) => (cursor ? [...prev, ...list] : list));
+      setNextCursor(res.data.next_cursor || null);
     } catch (e) {
       if (e.response?.status === 401) {
         localStorage.removeItem("token");
@@ -43,25 +48,28 @@ export default function Dashboard() {
 
   const handleView = async (docId) => {
     const token = localStorage.getItem("token");
-    try {
-      const res = await axios.get(
-        `http://localhost:8000/api/documents/view/${docId}`,
-        {
-          headers: { Authorization: `Bearer ${token}` },
-          responseType: "blob",
-        }
-      );
+    // open the tab before the request so popup blockers allow it
+    const win = window.open("", "_blank");
 
-      const blob = new Blob([res.data], {
-        type: res.headers["content-type"] || "application/pdf",
+    try {
+      // token goes in the header, never the URL (history, logs, Referer);
+      // the plain URL keeps the browser's HTTP cache + ETag revalidation working
+      const res = await axios.get(`http://localhost:8000/api/documents/view/${docId}`, {
+        headers: { Authorization: `Bearer ${token}` },
+        responseType: "blob",
       });
 
-      const url = window.URL.createObjectURL(blob);
-      window.open(url, "_blank");
-
-      setTimeout(() => window.URL.revokeObjectURL(url), 60000);
-    } catch (e) {
-      alert("Error opening document");
+      const url = URL.createObjectURL(res.data);
+      if (win) {
+        win.location.href = url;
+      } else {
+        window.open(url, "_blank");
+      }
+      // the opened tab keeps its own reference once loaded
+      setTimeout(() => URL.revokeObjectURL(url), 60000);
+    } catch {
+      if (win) win.close();
+      alert("Could not open document");
     }
   };
 
@@ -218,6 +226,17 @@ export default function Dashboard() {
           )}
 
         </div>
+
+        {!loading && nextCursor && (
+          <div className="mt-8 flex justify-center">
+            <button
+              onClick={() => loadDocs(localStorage.getItem("token"), nextCursor)}
+              className="px-6 py-2 rounded-lg btn-grad text-white"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </Layout>
   );
@@ -19,6 +19,7 @@ function downloadText(filename, text) {
 export default function Quizzes() {
   const [items, setItems] = useState(null); // null => skeleton
   const [deletingId, setDeletingId] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     const token = localStorage.getItem("token");
@@ -31,14 +32,16 @@ export default function Quizzes() {
     loadQuizzes(token);
   }, []);
 
-  const loadQuizzes = async (token) => {
+  const loadQuizzes = async (token, cursor = null) => {
     try {
       const res = await axios.get("http://localhost:8000/api/quizzes", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: cursor || undefined },
       });
 
       const list = res.data.quizzes || [];
-      setItems(list);
+      setItems((prev) => (cursor && prev ? [...prev, ...list] : list));
+      setNextCursor(res.data.next_cursor || null);
     } catch (e) {
       if (e.response?.status === 401) {
         localStorage.removeItem("token");
@@ -49,6 +52,19 @@ export default function Quizzes() {
     }
   };
 
+  // list rows only carry a preview — fetch the full quiz on demand
+  const loadFull = async (id) => {
+    const item = items.find((i) => i.id === id);
+    if (item?.questions) return item.questions;
+
+    const res = await axios.get(`http://localhost:8000/api/quizzes/${id}`, {
+      headers: { Authorization: `Bearer ${localStorage.getItem("token")}` },
+    });
+    const full = res.data.questions;
+    setItems((prev) => prev.map((i) => (i.id === id ? { ...i, questions: full } : i)));
+    return full;
+  };
+
   const remove = async (id) => {
     const token = localStorage.getItem("token");
     if (!token) {
@@ -105,15 +121,24 @@ export default function Quizzes() {
                   </div>
 
                   <div className="text-sm text-black dark:text-white/70 max-h-40 overflow-auto whitespace-pre-wrap leading-relaxed">
-                    {qz.questions}
+                    {qz.questions ?? qz.preview}
                   </div>
+
+                  {!qz.questions && (
+                    <button
+                      onClick={() => loadFull(qz.id)}
+                      className="mt-2 text-xs text-purple-500 hover:underline"
+                    >
+                      Show full
+                    </button>
+                  )}
                 </div>
 
                 {/* Right: buttons */}
                 <div className="flex flex-col gap-2 ml-2 shrink-0">
                   <button
                     onClick={() =>
-                      downloadText(`quiz_${qz.id}`, qz.questions)
+                      loadFull(qz.id).then((t) => downloadText(`quiz_${qz.id}`, t))
                     }
                     className="px-3 py-2 rounded-lg btn-grad text-white shadow-sm"
                   >
@@ -122,7 +147,7 @@ export default function Quizzes() {
 
                   <button
                     onClick={() =>
-                      navigator.clipboard.writeText(qz.questions)
+                      loadFull(qz.id).then((t) => navigator.clipboard.writeText(t))
                     }
                     className="px-3 py-2 rounded-lg bg.white/20 dark:bg-white/10 text-black dark:text.white border border-black/10 dark:border-white/10"
                   >
@@ -142,6 +167,17 @@ export default function Quizzes() {
           ))
         )}
       </div>
+
+      {nextCursor && (
+        <div className="mt-8 flex justify-center">
+          <button
+            onClick={() => loadQuizzes(localStorage.getItem("token"), nextCursor)}
+            className="px-6 py-2 rounded-lg btn-grad text-white"
+          >
+            Load more
+          </button>
+        </div>
+      )}
     </Layout>
   );
 }
@@ -19,6 +19,7 @@ function downloadText(filename, text) {
 export default function Summaries() {
   const [items, setItems] = useState(null); // null => skeleton
   const [deletingId, setDeletingId] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     const token = localStorage.getItem("token");
@@ -31,14 +32,16 @@ export default function Summaries() {
     loadSummaries(token);
   }, []);
 
-  const loadSummaries = async (token) => {
+  const loadSummaries = async (token, cursor = null) => {
     try {
       const res = await axios.get("http://localhost:8000/api/summaries", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: cursor || undefined },
       });
 
       const list = res.data.summaries || [];
-      setItems(list);
+      setItems((prev) => (cursor && prev ? [...prev, ...list] : list));
+      setNextCursor(res.data.next_cursor || null);
     } catch (e) {
       if (e.response?.status === 401) {
         localStorage.removeItem("token");
@@ -49,6 +52,19 @@ export default function Summaries() {
     }
   };
 
+  // list rows only carry a preview — fetch the full summary on demand
+  const loadFull = async (id) => {
+    const item = items.find((i) => i.id === id);
+    if (item?.text) return item.text;
+
+    const res = await axios.get(`http://localhost:8000/api/summaries/${id}`, {
+      headers: { Authorization: `Bearer ${localStorage.getItem("token")}` },
+    });
+    const full = res.data.text;
+    setItems((prev) => prev.map((i) => (i.id === id ? { ...i, text: full } : i)));
+    return full;
+  };
+
   const remove = async (id) => {
     const token = localStorage.getItem("token");
     if (!token) {
@@ -107,21 +123,30 @@ export default function Summaries() {
                   </div>
 
                   <div className="text-sm text-black dark:text-white/70 max-h-40 overflow-auto whitespace-pre-wrap leading-relaxed">
-                    {s.text}
+                    {s.text ?? s.preview}
                   </div>
+
+                  {!s.text && (
+                    <button
+                      onClick={() => loadFull(s.id)}
+                      className="mt-2 text-xs text-purple-500 hover:underline"
+                    >
+                      Show full
+                    </button>
+                  )}
                 </div>
 
                 {/* Right: actions */}
                 <div className="flex flex-col gap-2 ml-4 shrink-0">
                   <button
-                    onClick={() => downloadText(`summary_${s.id}`, s.text)}
+                    onClick={() => loadFull(s.id).then((t) => downloadText(`summary_${s.id}`, t))}
                     className="px-3 py-2 rounded-lg btn-grad text-white"
                   >
                     ⬇ Download
                   </button>
 
                   <button
-                    onClick={() => navigator.clipboard.writeText(s.text)}
+                    onClick={() => loadFull(s.id).then((t) => navigator.clipboard.writeText(t))}
                     className="px-3 py-2 rounded-lg bg-white/20 dark:bg-white/10
                       text-black dark:text-white
                       border border-black/10 dark:border-white/20"
@@ -142,6 +167,17 @@ export default function Summaries() {
           ))
         )}
       </div>
+
+      {nextCursor && (
+        <div className="mt-8 flex justify-center">
+          <button
+            onClick={() => loadSummaries(localStorage.getItem("token"), nextCursor)}
+            className="px-6 py-2 rounded-lg btn-grad text-white"
+          >
+            Load more
+          </button>
+        </div>
+      )}
     </Layout>
   );
 }
@@ -4,14 +4,54 @@ import { setAuthHeader } from "../api";
 import Layout from "../components/Layout";
 import Skeleton from "../components/Skeleton";
 
+// job polling: back off from 1s to 10s, flag the job as stalled when its
+// stage has not moved for 2 minutes and stop waiting after 10 minutes
+const POLL_MIN_MS = 1000;
+const POLL_MAX_MS = 10000;
+const STALL_MS = 2 * 60 * 1000;
+const DEADLINE_MS = 10 * 60 * 1000;
+
 export default function UploadPage() {
   const [file, setFile] = useState(null);
   const [processing, setProcessing] = useState(false);
+  const [stage, setStage] = useState("");
+  const [stalled, setStalled] = useState(false);
 
   const token = localStorage.getItem("token");
   if (!token) window.location.href = "/";
   setAuthHeader(token);
 
+  const waitForJob = async (jobId) => {
+    const deadline = Date.now() + DEADLINE_MS;
+    let delay = POLL_MIN_MS;
+    let lastStage = null;
+    let lastChange = Date.now();
+
+    while (Date.now() < deadline) {
+      try {
+        const res = await axios.get(`http://localhost:8000/api/jobs/${jobId}`);
+        const job = res.data;
+        if (job.status === "done" || job.status === "failed") return job;
+
+        const progress = `${job.status}:${job.stage}`;
+        if (progress !== lastStage) {
+          lastStage = progress;
+          lastChange = Date.now();
+          delay = POLL_MIN_MS;
+          setStage(job.stage);
+        }
+      } catch (e) {
+        // a 4xx will not get better by asking again
+        if (e.response && e.response.status < 500) throw e;
+      }
+
+      setStalled(Date.now() - lastChange > STALL_MS);
+      await new Promise((r) => setTimeout(r, delay));
+      delay = Math.min(delay * 2, POLL_MAX_MS);
+    }
+    return { status: "timeout" };
+  };
+
   const upload = async () => {
     if (!file) {
       alert("Please choose a file");
@@ -28,12 +68,23 @@ export default function UploadPage() {
         headers: { "Content-Type": "multipart/form-data" },
       });
 
-      alert(res.data.message + (res.data.duplicate ? " (duplicate)" : ""));
+      // ingestion runs in the background — poll the job until it settles
+      const job = await waitForJob(res.data.job_id);
+
+      if (job.status === "done") {
+        alert("Uploaded" + (job.result?.duplicate ? " (duplicate)" : ""));
+      } else if (job.status === "timeout") {
+        alert("Still processing. The document will appear on your dashboard once it is ready.");
+      } else {
+        alert("Processing failed: " + (job.error || "unknown error"));
+      }
       setFile(null);
     } catch (e) {
       alert("Upload failed: " + (e.response?.data?.detail || e.message));
     } finally {
       setProcessing(false);
+      setStage("");
+      setStalled(false);
     }
   };
 
@@ -106,9 +157,22 @@ export default function UploadPage() {
               <Skeleton className="h-3 w-4/5 mb-3" />
               <Skeleton className="h-3 w-1/2" />
 
-              <div className="mt-6 text-black/60 dark:text-white/60 text-sm">
-                Do not close this window.
-              </div>
+              {stage && (
+                <div className="mt-4 text-black/70 dark:text-white/70 text-sm capitalize">
+                  {stage}…
+                </div>
+              )}
+
+              {stalled ? (
+                <div className="mt-6 text-amber-600 dark:text-amber-300 text-sm">
+                  This is taking longer than usual. The server may be busy;
+                  you can close this window and check your dashboard later.
+                </div>
+              ) : (
+                <div className="mt-6 text-black/60 dark:text-white/60 text-sm">
+                  Do not close this window.
+                </div>
+              )}
             </div>
           </div>
         )}